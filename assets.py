@@ -0,0 +1,220 @@
+import json
+import os
+import struct
+
+import pygame
+
+from settings import *
+
+# Header of an asset bundle: magic string, version and size of the JSON index that follows it
+BUNDLE_HEADER = struct.Struct("<4sII")
+BUNDLE_MAGIC = b"BSAB"
+BUNDLE_VERSION = 1
+
+BACKGROUND_IMAGE = "images/background.png"
+
+# Returns the pixels of an image as bytes. pygame.image.tobytes was added in pygame 2.1.3, and older versions only have
+# pygame.image.tostring, which it replaces
+image_bytes = getattr(pygame.image, "tobytes", None) or pygame.image.tostring
+
+
+# Loads an image, converting it to the display's pixel format if a display has been created
+# The image's decoded pixels are used if the asset bundle has an up to date copy of them, instead of decoding the PNG
+def load_image(path):
+    image = Assets.asset_bundle().image(path) or pygame.image.load(path)
+    if pygame.display.get_surface() is None:  # Images can't be converted when running headless
+        return image
+
+    return image.convert_alpha()
+
+
+# Returns list of rects bounding each cloud in the background image, which is plain sky everywhere else
+def cloud_regions(background_img):
+    sky = pygame.mask.from_threshold(background_img, background_img.get_at((0, 0)), (1, 1, 1, 255))
+    sky.invert()
+    return sky.get_bounding_rects()
+
+
+# Returns the size and modification time of a file, which are saved in the asset bundle to tell if it is out of date
+def source_details(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+# Single file holding the decoded RGBA pixels of every image in images/, and the cloud regions of the background
+# It is read in one go, and images are created directly from its pixels, which is faster than decoding each PNG and
+# finding the clouds again. Masks aren't stored, as pygame can only build them from a surface, which is quick once the
+# pixels are decoded. Images that have changed since the bundle was built are loaded from their PNG instead. A missing
+# or unreadable bundle, or one without a path, is treated as an empty one
+class AssetBundle:
+    def __init__(self, path=ASSET_BUNDLE):
+        self.index = {"images": {}, "regions": None}  # Offset, size and source details of each image, and the regions
+        self.data = b""  # Pixel data of every image
+        if path is None:
+            return
+
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            magic, version, index_size = BUNDLE_HEADER.unpack_from(data)
+        except (OSError, struct.error):  # Missing or too short
+            return
+
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            print(f"Ignoring {path}, which is not a version {BUNDLE_VERSION} asset bundle")
+            return
+
+        start = BUNDLE_HEADER.size + index_size
+        self.index = json.loads(data[BUNDLE_HEADER.size:start])
+        self.data = memoryview(data)[start:]
+
+    # Returns the image at the given path, or None if it isn't in the bundle or has changed since the bundle was built
+    def image(self, path):
+        entry = self.index["images"].get(path)
+        if entry is None or source_details(path) != entry["source"]:
+            return None
+
+        width, height = entry["size"]
+        return pygame.image.frombuffer(self.data[entry["offset"]:entry["offset"] + width * height * 4], (width, height),
+                                       "RGBA")
+
+    # Returns list of rects bounding the clouds in the background image, or None if they aren't in the bundle
+    def regions(self):
+        entry = self.index["regions"]
+        if entry is None or source_details(BACKGROUND_IMAGE) != entry["source"]:
+            return None
+
+        return [pygame.Rect(rect) for rect in entry["rects"]]
+
+
+# Builds an asset bundle from every PNG image in the given folder. Returns the number of images bundled
+def build_bundle(path=ASSET_BUNDLE, directory="images"):
+    images = {}
+    chunks = []
+    offset = 0
+    for folder, folders, files in sorted(os.walk(directory)):
+        for name in sorted(files):
+            if not name.endswith(".png"):
+                continue
+
+            image_path = os.path.join(folder, name).replace(os.sep, "/")
+            image = pygame.image.load(image_path)
+            pixels = image_bytes(image, "RGBA")
+            images[image_path] = {"offset": offset, "size": list(image.get_size()),
+                                  "source": source_details(image_path)}
+            chunks.append(pixels)
+            offset += len(pixels)
+
+    regions = None
+    if os.path.exists(BACKGROUND_IMAGE):
+        rects = [list(rect) for rect in cloud_regions(pygame.image.load(BACKGROUND_IMAGE))]
+        regions = {"rects": rects, "source": source_details(BACKGROUND_IMAGE)}
+
+    index = json.dumps({"images": images, "regions": regions}).encode()
+    with open(path, "wb") as file:
+        file.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(index)))
+        file.write(index)
+        for chunk in chunks:
+            file.write(chunk)
+
+    return len(images)
+
+
+# Process-wide cache of the game's images, masks, fonts and text
+# Each image is loaded from disk, converted and has its mask built only once, then shared by every sprite that uses it.
+# Images loaded before a display is created can't be converted, so they are cached separately from converted ones.
+# Fonts are opened once for each size, and text that is drawn every time a screen is opened is rendered only once
+class Assets:
+    images = {}  # Loaded images, keyed by path and whether they were converted
+    fonts = {}  # Loaded fonts, keyed by path and size
+    texts = {}  # Rendered text, keyed by text, font path, size and colour
+    masks = {}  # Masks of loaded images, keyed the same way as images
+    backgrounds = {}  # Scrolling background surfaces, keyed by whether they were converted
+    regions = None  # Rects of the parts of the background image that aren't plain sky
+    bundle = None  # Asset bundle images are read from, loaded when the first image is
+
+    BIRD_FRAMES = [f"images/bird/bird{i}.png" for i in range(1, 9)]  # Paths of the bird animation frames
+
+    # Returns the image at the given path
+    @classmethod
+    def image(cls, path):
+        key = (path, pygame.display.get_surface() is not None)
+        try:
+            return cls.images[key]
+        except KeyError:
+            cls.images[key] = load_image(path)
+            return cls.images[key]
+
+    # Returns the mask of the image at the given path
+    @classmethod
+    def mask(cls, path):
+        key = (path, pygame.display.get_surface() is not None)
+        try:
+            return cls.masks[key]
+        except KeyError:
+            cls.masks[key] = pygame.mask.from_surface(cls.image(path))
+            return cls.masks[key]
+
+    # Returns list of the bird animation frames
+    @classmethod
+    def bird_frames(cls):
+        return [cls.image(path) for path in cls.BIRD_FRAMES]
+
+    # Returns list of the masks of the bird animation frames
+    @classmethod
+    def bird_masks(cls):
+        return [cls.mask(path) for path in cls.BIRD_FRAMES]
+
+    # Returns surface with the background image drawn on it twice, side by side, used for the scrolling background
+    @classmethod
+    def background(cls):
+        key = pygame.display.get_surface() is not None
+        try:
+            return cls.backgrounds[key]
+        except KeyError:
+            background_img = cls.image(BACKGROUND_IMAGE)
+            rect = background_img.get_rect()
+
+            # Background is opaque, so it is converted without per-pixel alpha, which is faster to draw
+            surface = pygame.Surface((rect.width * 2, rect.height))
+            if key:
+                surface = surface.convert()
+            surface.blits(blit_sequence=((background_img, (0, 0)), (background_img, (rect.width, 0))))
+            cls.backgrounds[key] = surface
+            return surface
+
+    # Returns list of rects bounding each cloud in the background image, which is plain sky everywhere else
+    @classmethod
+    def background_regions(cls):
+        if cls.regions is None:
+            cls.regions = cls.asset_bundle().regions() or cloud_regions(cls.image(BACKGROUND_IMAGE))
+
+        return cls.regions
+
+    # Returns the asset bundle, reading it the first time it is needed
+    @classmethod
+    def asset_bundle(cls):
+        if cls.bundle is None:
+            cls.bundle = AssetBundle(ASSET_BUNDLE)
+        return cls.bundle
+
+    # Returns the font at the given path in the given size
+    @classmethod
+    def font(cls, size, path=FONT_FILE):
+        key = (path, size)
+        try:
+            return cls.fonts[key]
+        except KeyError:
+            cls.fonts[key] = pygame.font.Font(path, size)
+            return cls.fonts[key]
+
+    # Returns surface of the given text rendered in the given font size and colour
+    # Only used for fixed text, such as titles and button labels, as every text rendered is kept
+    @classmethod
+    def text(cls, text, size, colour=WHITE, path=FONT_FILE):
+        key = (text, path, size, colour)
+        try:
+            return cls.texts[key]
+        except KeyError:
+            cls.texts[key] = cls.font(size, path).render(text, False, colour)
+            return cls.texts[key]
@@ -0,0 +1,105 @@
+import numpy as np
+from neat.graphs import feed_forward_layers
+
+
+# Evaluates the feed-forward networks of a whole generation of genomes at once
+# The networks are packed into padded weight and bias matrices grouped by layer depth, so the outputs of every plane
+# can be calculated with one batched matrix multiplication per layer instead of one network activation per plane.
+# Uses the same sum aggregation and sigmoid activation as NEAT's FeedForwardNetwork
+class BatchNetwork:
+    def __init__(self, genomes, config):
+        genome_config = config.genome_config
+        self.num_inputs = len(genome_config.input_keys)
+        self.zero_column = self.num_inputs  # Column of the state matrix that is always 0
+
+        # Get the layers of each genome's network
+        networks = [self.get_layers(genome, genome_config) for genome in genomes]
+
+        # Number of nodes in each layer, padded to the widest network at that depth
+        depth = max((len(layers) for layers in networks), default=0)
+        self.widths = [max(len(layers[d]) for layers in networks if len(layers) > d) for d in range(depth)]
+
+        # Index of the first column of the state matrix that each layer's node values are stored in
+        self.starts = []
+        column = self.num_inputs + 1
+        for width in self.widths:
+            self.starts.append(column)
+            column += width
+        self.num_columns = column
+
+        # Weight, bias and response matrices for each layer. Padding nodes have no connections
+        num_genomes = len(genomes)
+        self.weights = [np.zeros((num_genomes, start, width)) for start, width in zip(self.starts, self.widths)]
+        self.biases = [np.zeros((num_genomes, width)) for width in self.widths]
+        self.responses = [np.ones((num_genomes, width)) for width in self.widths]
+
+        # Column containing each of the output nodes' values. Outputs that aren't connected are always 0
+        self.output_columns = np.full((num_genomes, len(genome_config.output_keys)), self.zero_column)
+
+        for row, layers in enumerate(networks):
+            columns = {key: num for num, key in enumerate(genome_config.input_keys)}
+            for d, layer in enumerate(layers):
+                for num, (node, bias, response, links) in enumerate(layer):
+                    for inode, weight in links:
+                        self.weights[d][row, columns[inode], num] = weight
+
+                    self.biases[d][row, num] = bias
+                    self.responses[d][row, num] = response
+                    columns[node] = self.starts[d] + num
+
+            for num, key in enumerate(genome_config.output_keys):
+                self.output_columns[row, num] = columns.get(key, self.zero_column)
+
+        # Matrices gathered for the rows passed to the last activate call
+        self.rows = None
+        self.gathered = None
+
+    # Returns array containing the outputs of the networks in the given rows for each row of inputs
+    def activate(self, inputs, rows):
+        if self.rows is None or not np.array_equal(rows, self.rows):
+            self.gather(rows)
+
+        weights, biases, responses, output_columns = self.gathered
+
+        state = np.zeros((len(rows), self.num_columns))
+        state[:, :self.num_inputs] = inputs
+        for d, (start, width) in enumerate(zip(self.starts, self.widths)):
+            total = np.matmul(state[:, np.newaxis, :start], weights[d])[:, 0]
+            state[:, start:start + width] = sigmoid(biases[d] + responses[d] * total)
+
+        return np.take_along_axis(state, output_columns, axis=1)
+
+    # Gathers the matrices of the networks in the given rows, so they are only copied when the rows change
+    def gather(self, rows):
+        self.rows = np.array(rows)
+        self.gathered = ([weights[self.rows] for weights in self.weights],
+                         [biases[self.rows] for biases in self.biases],
+                         [responses[self.rows] for responses in self.responses],
+                         self.output_columns[self.rows])
+
+    # Returns the layers of a genome's network as lists of (node, bias, response, links) tuples
+    @staticmethod
+    def get_layers(genome, genome_config):
+        connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+
+        layers = []
+        for layer in feed_forward_layers(genome_config.input_keys, genome_config.output_keys, connections):
+            nodes = []
+            for node in sorted(layer):
+                ng = genome.nodes[node]
+                if ng.activation != "sigmoid" or ng.aggregation != "sum":
+                    raise ValueError(f"Node {node} uses {ng.activation} activation and {ng.aggregation} aggregation. "
+                                     f"BatchNetwork only supports sigmoid activation and sum aggregation")
+
+                links = [(inode, genome.connections[(inode, onode)].weight) for inode, onode in connections
+                         if onode == node]
+                nodes.append((node, ng.bias, ng.response, links))
+
+            layers.append(nodes)
+
+        return layers
+
+
+# Sigmoid activation function used by NEAT, applied to every element of an array
+def sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0)))
@@ -0,0 +1,386 @@
+import argparse
+import copy
+import json
+import os
+import pickle
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Benchmarks run without opening a window
+
+import neat
+import numpy as np
+import pygame
+
+from compiled_network import CompiledNetwork
+from settings import *
+
+# Unit of each benchmark result. Results measured per second are better when higher, results in seconds when lower
+UNITS = {
+    "ticks": "ticks/s",
+    "activate": "calls/s",
+    "collision": "checks/s",
+    "generation": "s",
+    "first_frame": "s",
+}
+
+PLANE_COUNTS = [1, 200, 2000]  # Numbers of planes the game loop is timed with
+DEFAULT_BASELINE = "benchmark-baseline.json"
+DEFAULT_GENOME = "ai-instances/AI-1/best.pickle"
+GENOME_MUTATIONS = 3  # Number of times each copy of the genome is mutated when timing the game loop
+
+# Most seconds the program may take to draw the start screen after being started when --first-frame-target is passed
+# without a value. Start up time depends on the machine, so the target is only checked when asked for
+FIRST_FRAME_TARGET = 0.75
+
+# Script run in a new process to time how long the program takes to draw its first frame. The program is started with
+# the screen given as an argument ("menu" or "game") as the first screen, and exits as soon as the window is updated
+FIRST_FRAME_SCRIPT = """
+import os
+import sys
+
+import pygame
+
+update = pygame.display.update
+
+
+def first_frame(*args):
+    update(*args)
+    os._exit(0)
+
+
+pygame.display.update = first_frame
+import main
+if sys.argv[1] == "game":
+    main.StartScreen = main.Game
+main.Main(main.WIDTH, main.HEIGHT, main.TITLE)
+"""
+
+
+# Returns the number of times a network can be activated per second
+def activations_per_second(network, inputs, seconds):
+    count = 0
+    start = time.perf_counter()
+    end = start + seconds
+    while time.perf_counter() < end:
+        for row in inputs:
+            network.activate(row)
+        count += len(inputs)
+
+    return count / (time.perf_counter() - start)
+
+
+# Returns the number of times a function can be called per second
+def calls_per_second(function, seconds):
+    function()  # Warm up any caches before timing
+
+    count = 0
+    start = time.perf_counter()
+    end = start + seconds
+    while time.perf_counter() < end:
+        function()
+        count += 1
+
+    return count / (time.perf_counter() - start)
+
+
+# Returns NEAT config loaded from the config file
+def load_config():
+    return neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                              neat.DefaultStagnation, CONFIG_FILE)
+
+
+# Returns list of (genome id, genome) tuples containing the given genome, followed by copies of it that have each been
+# mutated 'mutations' times. Every plane then has its own network and dies at its own tick, as in a population being
+# trained, and the same genomes are created for a given seed
+def mutated_genomes(genome, config, num_genomes, seed, mutations=GENOME_MUTATIONS):
+    random.seed(seed)  # NEAT uses the global random number generator to mutate genomes
+    genomes = []
+    for genome_id in range(1, num_genomes + 1):
+        clone = copy.deepcopy(genome)
+        clone.key = genome_id
+        if genome_id > 1:
+            for mutation in range(mutations):
+                clone.mutate(config.genome_config)
+        genomes.append((genome_id, clone))
+
+    config.genome_config.node_indexer = None  # Don't number the nodes of later benchmarks' genomes after these ones
+    return genomes
+
+
+# Compares the speed of NEAT's FeedForwardNetwork with the compiled network of a genome
+def bench_activate(genome, config, seconds):
+    # Inputs similar to those seen in game: plane height followed by distances to birds
+    rng = random.Random(0)
+    inputs = [[rng.randint(24, HEIGHT - 24)] + [rng.randint(-600, 600) for i in range(NUM_INPUTS - 1)]
+              for j in range(1000)]
+
+    stock = neat.nn.FeedForwardNetwork.create(genome, config)
+    compiled = CompiledNetwork.create(genome, config)
+    if any(stock.activate(row) != compiled.activate(row) for row in inputs):
+        raise AssertionError("Compiled network outputs differ from FeedForwardNetwork outputs")
+
+    return {
+        "activate.feedforward": activations_per_second(stock, inputs, seconds),
+        "activate.compiled": activations_per_second(compiled, inputs, seconds),
+    }
+
+
+# Times the game loop of each engine with the given numbers of planes, each controlled by a mutated copy of the genome
+# Every engine plays the same seeded episode, which is ended after 'ticks' ticks if the planes survive that long
+def bench_ticks(master, genome, config, plane_counts, ticks, seed):
+    from game import Game
+    from simulation import PopulationSim
+
+    # Ends the episode once the tick limit is reached
+    def limit_ticks(engine):
+        events = engine.events
+
+        def limited_events(*args):
+            events(*args)
+            if engine.tickcount >= ticks:
+                engine.running = False
+
+        engine.events = limited_events
+
+    # Game engine, set up as the headless trainer does
+    class LimitedGame(Game):
+        def run(self):
+            limit_ticks(self)
+            super().run()
+
+    class LimitedSim(PopulationSim):
+        def run(self):
+            limit_ticks(self)
+            super().run()
+
+    LimitedGame.master = master
+    LimitedGame.population = None
+    LimitedGame.stages = SPEED_STAGES
+    LimitedGame.stage = 0
+    LimitedGame.cap = False
+    LimitedGame.quick_time = False
+    LimitedGame.headless = True
+    LimitedSim.master = master
+
+    results = {}
+    for num_planes in plane_counts:
+        for engine, from_ai in (("vector", LimitedSim.from_ai), ("game", LimitedGame.from_ai)):
+            genomes = mutated_genomes(genome, config, num_planes, seed)
+
+            start = time.perf_counter()
+            game = from_ai(genomes, config, seed)
+            elapsed = time.perf_counter() - start
+
+            results[f"ticks.{engine}.{num_planes}"] = game.tickcount / elapsed
+
+    return results
+
+
+# Times collision checks between planes and a column of birds crossing them
+# Planes are spread over the screen so that some, but not all, collide with the birds
+def bench_collision(master, seconds, seed):
+    from sprites import Bird, Player, pixelperfect_collision
+    from collision import sweep_collide
+    from world import World
+
+    rng = random.Random(seed)
+    world = World(master.SCREENRECT)
+    birds = world.birds
+    for num in range(6):
+        bird = Bird(world, rng.randint(0, HEIGHT))
+        bird.rect.centerx = master.SCREENRECT.centerx + rng.randint(-60, 60)
+
+    results = {}
+    for num_planes in (1, 200):
+        plane_world = World(master.SCREENRECT)  # Planes of each count are created in their own world
+        players = plane_world.players
+        for num in range(num_planes):
+            Player(plane_world).rect.centery = rng.randint(0, HEIGHT)
+
+        results[f"collision.pixelperfect.{num_planes}"] = \
+            calls_per_second(lambda: pixelperfect_collision(players, birds, False, False), seconds)
+        results[f"collision.sweep.{num_planes}"] = \
+            calls_per_second(lambda: sweep_collide(players, birds, False, False), seconds)
+        results[f"collision.sweep_pixel_perfect.{num_planes}"] = \
+            calls_per_second(lambda: sweep_collide(players, birds, False, False, True), seconds)
+
+    return results
+
+
+# Times generations of training a new population with the vectorised engine, as the headless trainer does
+def bench_generation(master, config, generations, seed):
+    from simulation import PopulationSim
+
+    PopulationSim.master = master
+    CompiledNetwork.cache.clear()
+    random.seed(seed)  # NEAT uses the global random number generator to create and mutate genomes
+    seeds = random.Random(seed)
+
+    population = neat.Population(config)
+    start = time.perf_counter()
+    population.run(lambda genomes, config: PopulationSim.from_ai(genomes, config, seeds.getrandbits(32)), generations)
+    elapsed = time.perf_counter() - start
+
+    return {"generation.vector": elapsed / generations}
+
+
+# Returns the median seconds taken to start the program in a new process and draw the first frame of each screen
+# Python's compiled bytecode is cached after the first run, so every run starts as it does for a player
+def bench_first_frame(runs):
+    results = {}
+    for screen in ("menu", "game"):
+        subprocess.run([sys.executable, "-c", FIRST_FRAME_SCRIPT, screen], check=True, stdout=subprocess.DEVNULL)
+
+        times = []
+        for run in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", FIRST_FRAME_SCRIPT, screen], check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        results[f"first_frame.{screen}"] = statistics.median(times)
+
+    return results
+
+
+# Runs every benchmark and returns dictionary of results
+def run_benchmarks(genome_path, seconds, ticks, generations, seed, runs, plane_counts=PLANE_COUNTS):
+    from simulation import HeadlessMain
+
+    # Create a display with the dummy video driver so images are converted, as they are in game
+    pygame.init()
+    master = HeadlessMain(WIDTH, HEIGHT)
+    master.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    master.clock = pygame.time.Clock()
+
+    config = load_config()
+    with open(genome_path, "rb") as file:
+        genome = pickle.load(file)
+
+    results = {}
+    results.update(bench_ticks(master, genome, config, plane_counts, ticks, seed))
+    results.update(bench_activate(genome, config, seconds))
+    results.update(bench_collision(master, seconds, seed))
+    results.update(bench_generation(master, config, generations, seed))
+    results.update(bench_first_frame(runs))
+
+    pygame.quit()
+    return results
+
+
+# Returns the unit of a result
+def unit(name):
+    return UNITS[name.split(".")[0]]
+
+
+# Returns list of (name, result, baseline, change) tuples for results that are more than 'threshold' worse than the
+# baseline, where change is the fractional change in throughput
+def find_regressions(results, baseline, threshold):
+    regressions = []
+    for name, value in results.items():
+        if name not in baseline:
+            continue
+
+        # Compare throughput, so lower times are converted to higher rates
+        old = baseline[name]
+        change = value / old - 1 if unit(name) != "s" else old / value - 1
+        if change < -threshold:
+            regressions.append((name, value, old, change))
+
+    return regressions
+
+
+# Prints results, along with their change from the baseline if there is one
+def print_results(results, baseline=None):
+    for name, value in results.items():
+        line = f"{name:<40}{value:>16,.{3 if unit(name) == 's' else 0}f} {unit(name):<9}"
+        if baseline and name in baseline:
+            old = baseline[name]
+            change = value / old - 1 if unit(name) != "s" else old / value - 1
+            line += f" {change:+.1%} vs baseline"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Birdstrike benchmarks. Exits with status 1 if a result has "
+                                                 "regressed from the baseline by more than the threshold, or the "
+                                                 "first frame target is given and missed")
+    parser.add_argument("--genome",
+                        help=f"pickled genome that controls the planes and is activated (default: {DEFAULT_GENOME})")
+    parser.add_argument("--seconds", type=float, default=2.0,
+                        help="time spent timing each network and collision function")
+    parser.add_argument("--ticks", type=int, default=600, help="max ticks the game loop is timed for")
+    parser.add_argument("--generations", type=int, default=5, help="number of generations timed")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to spawn birds and create genomes")
+    parser.add_argument("--runs", type=int, default=5,
+                        help="number of times the program is started to time its first frame (default: 5)")
+    parser.add_argument("--output", help="JSON file the results are saved to")
+    parser.add_argument("--baseline",
+                        help=f"baseline JSON file (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--first-frame-target", type=float, nargs="?", const=FIRST_FRAME_TARGET, metavar="SECONDS",
+                        help="fail if the program takes longer than SECONDS to draw the start screen after being "
+                             f"started (default if passed without a value: {FIRST_FRAME_TARGET})")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="fraction throughput can drop by before it is a regression (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    # Paths given by the user are relative to the current directory, and the defaults to the program's directory
+    args.output = args.output and os.path.abspath(args.output)
+    args.baseline = os.path.abspath(args.baseline) if args.baseline else DEFAULT_BASELINE
+    args.genome = os.path.abspath(args.genome) if args.genome else DEFAULT_GENOME
+
+    # Asset and save paths are relative to the program's directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    results = run_benchmarks(args.genome, args.seconds, args.ticks, args.generations, args.seed, args.runs)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "neat": getattr(neat, "__version__", None),
+        "args": {"genome": args.genome, "seconds": args.seconds, "ticks": args.ticks,
+                 "generations": args.generations, "seed": args.seed, "runs": args.runs},
+        "results": results,
+    }
+
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+    except FileNotFoundError:
+        baseline = None
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    failed = False
+    if args.first_frame_target is not None and results["first_frame.menu"] > args.first_frame_target:
+        print(f"Missed target: first_frame.menu {results['first_frame.menu']:.3f} s "
+              f"(target {args.first_frame_target:.3f} s)")
+        failed = not args.save_baseline  # Saving a baseline records the results whatever they are
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif baseline:
+        regressions = find_regressions(results, baseline, args.threshold)
+        for name, value, old, change in regressions:
+            print(f"Regression: {name} {change:+.1%} ({old:,.3f} -> {value:,.3f} {unit(name)})")
+        failed = failed or bool(regressions)
+
+    if failed:
+        sys.exit(1)
+
+
+# Run the benchmarks if this file is executed
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import argparse
+import os
+import random
+import time
+
+import neat
+
+from settings import *
+
+
+# Trains an AI instance without opening a window
+def train(ai_name, generations=None, quiet=False, engine="vector", workers=1, seed=None,
+          pixel_perfect=PIXEL_PERFECT_TRAINING, record=False, profile=None, fixed_seed=False,
+          episodes=TRAINING_EPISODES, aggregate=EPISODE_AGGREGATE):
+    from fitness_cache import FitnessCache
+    from game import Game, load_population, profile_path
+    from parallel import ParallelEvaluator
+    from profiling import NULL_TIMER, GenerationProfiler
+    from simulation import HeadlessMain, PopulationSim
+
+    # Load settings from NEAT config file
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                                neat.DefaultStagnation, CONFIG_FILE)
+
+    # Create population
+    population = load_population(ai_name, config)
+    if not quiet:
+        population.add_reporter(neat.StdOutReporter(False))
+
+    Game.master = HeadlessMain(WIDTH, HEIGHT)
+    Game.population = population
+    Game.stages = SPEED_STAGES
+    Game.stage = 0
+    Game.cap = False
+    Game.quick_time = False
+    Game.headless = True
+    Game.pixel_perfect = pixel_perfect
+    PopulationSim.master = Game.master
+    PopulationSim.pixel_perfect = pixel_perfect
+    PopulationSim.episodes = episodes
+    PopulationSim.aggregate = aggregate
+
+    # Time each phase of training, logging the times of each generation
+    # Ticks simulated by worker processes aren't timed
+    if profile is not None:
+        population.profiler = GenerationProfiler(profile or profile_path(ai_name))
+        Game.timer = PopulationSim.timer = population.profiler.ticks
+    else:
+        Game.timer = PopulationSim.timer = NULL_TIMER
+
+    # Vectorised engine simulates the whole population at once, game engine simulates each plane as a sprite.
+    # With multiple workers, genomes are simulated separately by the vectorised engine in worker processes
+    evaluator = ParallelEvaluator(workers or None) if workers != 1 else None
+    if evaluator:
+        from_ai = evaluator.evaluate
+    elif record:
+        # Simulate the population with the vectorised engine, saving a recording of each generation
+        def from_ai(genomes, config, seed):
+            sim = PopulationSim.from_ai(genomes, config, seed, True)
+            sim.recorder.save(f"{RECORDINGS_DIR}/{ai_name}/gen-{population.generation}.episode")
+    else:
+        from_ai = PopulationSim.from_ai if engine == "vector" else Game.from_ai
+
+    # Reuse the fitness of genomes already simulated when every generation has the same seed, unless every plane has to
+    # be recorded. With a new seed each generation, only identical genomes in the same generation could be reused, which
+    # saves less than keying every genome costs
+    if fixed_seed and not record:
+        from_ai = FitnessCache(from_ai, pixel_perfect, episodes=episodes, aggregate=aggregate).evaluate
+
+    # Generates the seed used to spawn the birds in each generation, or uses the same seed for every generation
+    seeds = random.Random(seed)
+    fixed = seed or 0
+
+    # Fitness function that stops training and saves progress when interrupted
+    def fitness_function(genomes, config):
+        try:
+            from_ai(genomes, config, fixed if fixed_seed else seeds.getrandbits(32))
+        except KeyboardInterrupt:
+            population.running = False
+
+    try:
+        population.run(fitness_function, generations)
+    finally:
+        if evaluator:
+            evaluator.close()
+
+
+# Trains an AI instance as several islands evolving in separate processes, which exchange their best genomes
+def train_islands(ai_name, num_islands, generations=None, quiet=False, seed=None, pixel_perfect=PIXEL_PERFECT_TRAINING,
+                  interval=ISLAND_MIGRATION_INTERVAL, num_migrants=ISLAND_MIGRANTS, episodes=TRAINING_EPISODES,
+                  aggregate=EPISODE_AGGREGATE):
+    from islands import IslandCoordinator
+
+    coordinator = IslandCoordinator(ai_name, num_islands, interval, num_migrants, quiet)
+    coordinator.run(generations, seed, pixel_perfect, episodes, aggregate)
+
+
+# Replays a recorded episode, either in a window or headlessly
+def replay(path, speed=1, headless=False):
+    import pygame
+    from recording import EpisodeReplay
+    from simulation import HeadlessMain
+
+    master = HeadlessMain(WIDTH, HEIGHT)
+    if headless:
+        episode = EpisodeReplay(master, path)
+
+        start = time.perf_counter()
+        episode.run_headless()
+        elapsed = time.perf_counter() - start
+
+        print(f"Replayed {episode.tickcount} ticks in {elapsed:.3f}s ({episode.tickcount / elapsed:,.0f} ticks/s)")
+        print(f"Planes: {episode.num_planes}, survived: {len(episode.alive)}, final score: {episode.score}, "
+              f"seed: {episode.seed}")
+    else:
+        pygame.init()
+        master.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        master.clock = pygame.time.Clock()
+        pygame.display.set_caption(f"{TITLE} - {os.path.basename(path)}")
+
+        EpisodeReplay(master, path).run(SPEED_STAGES.index(speed))
+        pygame.quit()
+
+
+# Converts a NEAT checkpoint to a compact checkpoint, or a compact checkpoint to a NEAT checkpoint
+def convert(path, output, best=None):
+    import pickle
+    from compact_checkpoint import CompactCheckpoint, is_compact, to_compact, to_neat
+
+    if is_compact(path):
+        to_neat(path, output)
+        print(f"Converted compact checkpoint {path} to NEAT checkpoint {output}")
+    else:
+        best_genome = None
+        if best:
+            with open(best, "rb") as file:
+                best_genome = pickle.load(file)
+
+        to_compact(path, output, best_genome)
+        with CompactCheckpoint(output) as checkpoint:
+            print(f"Converted NEAT checkpoint {path} to compact checkpoint {output}")
+            print(f"Generation: {checkpoint.generation}, best fitness: {checkpoint.best_fitness:g}, "
+                  f"config hash: {checkpoint.config_hash[:16]}")
+
+
+# Builds the asset bundle from the images in images/
+def bundle(output=ASSET_BUNDLE):
+    from assets import build_bundle
+
+    start = time.perf_counter()
+    count = build_bundle(output)
+    elapsed = time.perf_counter() - start
+    print(f"Bundled {count} images into {output} ({os.path.getsize(output) / 1024:,.0f} KiB) in {elapsed:.2f}s")
+
+
+# Creates the command line argument parser
+def create_parser():
+    parser = argparse.ArgumentParser(prog="birdstrike", description="Birdstrike command line tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="train an AI instance without opening a window")
+    train_parser.add_argument("--instance", required=True, help="name of the AI instance to train")
+    train_parser.add_argument("--generations", type=int, default=None,
+                              help="number of generations to train for (runs until interrupted if omitted)")
+    train_parser.add_argument("--engine", choices=["vector", "game"], default="vector",
+                              help="engine used to simulate the population (default: vector)")
+    train_parser.add_argument("--workers", type=int, default=1,
+                              help="number of worker processes used to evaluate genomes, or 0 to use every core "
+                                   "(default: 1)")
+    train_parser.add_argument("--islands", type=int, default=1,
+                              help="number of islands that evolve separate populations in their own processes and "
+                                   "exchange their best genomes, or 0 for one island per core (default: 1)")
+    train_parser.add_argument("--migration-interval", type=int, default=ISLAND_MIGRATION_INTERVAL, metavar="K",
+                              help="generations between islands sending genomes to the next island "
+                                   f"(default: {ISLAND_MIGRATION_INTERVAL})")
+    train_parser.add_argument("--migrants", type=int, default=ISLAND_MIGRANTS, metavar="M",
+                              help=f"number of genomes each island sends in a migration (default: {ISLAND_MIGRANTS})")
+    train_parser.add_argument("--seed", type=int, default=None,
+                              help="seed used to generate the birds spawned in each generation")
+    train_parser.add_argument("--fixed-seed", action="store_true",
+                              help="spawn the same birds in every generation, from --seed or 0, so the fitness of "
+                                   "genomes carried over unchanged can be reused")
+    train_parser.add_argument("--pixel-perfect", action="store_true", default=PIXEL_PERFECT_TRAINING,
+                              help="use pixel perfect collision, as when testing, instead of rect collision"
+                                   f"{' (default)' if PIXEL_PERFECT_TRAINING else ''}")
+    train_parser.add_argument("--no-pixel-perfect", action="store_false", dest="pixel_perfect",
+                              help="use rect collision, which is faster, instead of pixel perfect collision"
+                                   f"{'' if PIXEL_PERFECT_TRAINING else ' (default)'}")
+    train_parser.add_argument("--episodes", type=int, default=TRAINING_EPISODES, metavar="K",
+                              help="number of episodes each genome plays in each generation, with the same birds for "
+                                   f"every genome (default: {TRAINING_EPISODES})")
+    train_parser.add_argument("--aggregate", choices=["mean", "min"], default=EPISODE_AGGREGATE,
+                              help="how the fitness of a genome in each episode is combined into its fitness "
+                                   f"(default: {EPISODE_AGGREGATE})")
+    train_parser.add_argument("--record", action="store_true",
+                              help=f"save a recording of each generation to {RECORDINGS_DIR}/<instance>")
+    train_parser.add_argument("--profile", nargs="?", const="", metavar="FILE",
+                              help="log the time spent in each phase of each generation to FILE, as CSV or as JSON "
+                                   f"lines if it ends in .jsonl (default: {PROFILES_DIR}/<instance>-<time>.csv)")
+    train_parser.add_argument("--quiet", action="store_true", help="don't print statistics for each generation")
+
+    replay_parser = subparsers.add_parser("replay", help="replay a recorded episode")
+    replay_parser.add_argument("file", help="episode file to replay")
+    replay_parser.add_argument("--speed", type=int, choices=SPEED_STAGES, default=1,
+                               help="speed multiplier the episode is replayed at (default: 1)")
+    replay_parser.add_argument("--headless", action="store_true",
+                               help="re-simulate the episode as fast as possible without opening a window")
+
+    convert_parser = subparsers.add_parser("convert", help="convert a checkpoint between NEAT's format and the "
+                                                           "compact format")
+    convert_parser.add_argument("file", help="checkpoint to convert, whose format is detected automatically")
+    convert_parser.add_argument("output", help="file the converted checkpoint is written to")
+    convert_parser.add_argument("--best", metavar="FILE",
+                                help="pickled best genome stored in the compact checkpoint, such as "
+                                     "ai-instances/<instance>/best.pickle")
+
+    bundle_parser = subparsers.add_parser("bundle", help="build the asset bundle, which holds the decoded images so "
+                                                         "the game starts faster")
+    bundle_parser.add_argument("--output",
+                               help=f"file the bundle is written to (default: {ASSET_BUNDLE})")
+
+    return parser
+
+
+def main(argv=None):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    if args.command in ("replay", "convert"):
+        args.file = os.path.abspath(args.file)
+    if args.command == "convert":
+        args.output = os.path.abspath(args.output)
+        args.best = args.best and os.path.abspath(args.best)
+    if args.command == "bundle":
+        args.output = os.path.abspath(args.output) if args.output else ASSET_BUNDLE
+
+    # Asset and save paths are relative to the program's directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    if args.command == "train":
+        if args.workers < 0:
+            parser.error("--workers must be at least 0")
+        if args.workers != 1 and args.engine != "vector":
+            parser.error("--workers can only be used with the vector engine")
+        if args.record and (args.engine != "vector" or args.workers != 1):
+            parser.error("--record can only be used with the vector engine and one worker")
+        if args.islands != 1 and (args.engine != "vector" or args.workers != 1 or args.record or args.fixed_seed or
+                                  args.profile is not None):
+            parser.error("--islands can only be used with the vector engine and one worker, without --record, "
+                         "--fixed-seed or --profile")
+        if args.episodes < 1:
+            parser.error("--episodes must be at least 1")
+        if args.episodes > 1 and (args.engine != "vector" or args.record):
+            parser.error("--episodes can only be used with the vector engine, without --record")
+        if args.islands < 0:
+            parser.error("--islands must be at least 0")
+        if args.migration_interval < 1:
+            parser.error("--migration-interval must be at least 1")
+        if args.migrants < 0:
+            parser.error("--migrants must be at least 0")
+
+        if args.islands != 1:
+            train_islands(args.instance, args.islands, args.generations, args.quiet, args.seed, args.pixel_perfect,
+                          args.migration_interval, args.migrants, args.episodes, args.aggregate)
+        else:
+            train(args.instance, args.generations, args.quiet, args.engine, args.workers, args.seed,
+                  args.pixel_perfect, args.record, args.profile, args.fixed_seed, args.episodes, args.aggregate)
+    elif args.command == "replay":
+        replay(args.file, args.speed, args.headless)
+    elif args.command == "convert":
+        convert(args.file, args.output, args.best)
+    elif args.command == "bundle":
+        bundle(args.output)
+
+
+# Start the program if this file is executed
+if __name__ == "__main__":
+    main()
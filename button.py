@@ -1,4 +1,6 @@
 import pygame
+
+from assets import Assets
 from settings import *
 
 
@@ -6,9 +8,9 @@ from settings import *
 class Button(pygame.sprite.Sprite):
     def __init__(self, text, pos, height, button_group, onclick=None, end_onclick=True, anchor='center', *args):
         pygame.sprite.Sprite.__init__(self, button_group)
-        self.font_object = pygame.font.Font("game-font.ttf", height)  # Create font object
-        self.default_text = self.font_object.render(text, False, WHITE)  # Text displayed when not highlighted
-        self.highlighted_text = self.font_object.render(text, False, DIMMED_WHITE)  # Text displayed when highlighted
+        # Labels are rendered once and shared by every button with the same text and height
+        self.default_text = Assets.text(text, height, WHITE)  # Text displayed when not highlighted
+        self.highlighted_text = Assets.text(text, height, DIMMED_WHITE)  # Text displayed when highlighted
         self.onclick = onclick  # Function to be called when button is clicked
         self.end_onclick = end_onclick  # Decides whether or not the screen should end after a button is clicked
         self.args = args
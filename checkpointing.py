@@ -0,0 +1,145 @@
+import gzip
+import os
+import pickle
+import queue
+import random
+import re
+import threading
+import time
+
+from neat.checkpoint import Checkpointer
+
+from compact_checkpoint import CompactCheckpoint, encode, is_compact
+from settings import *
+
+
+# Saves checkpoints of a population every few generations or minutes without stopping training to write them
+# The population is pickled when the checkpoint is taken, since NEAT changes the species set in the next generation,
+# then compressed and written by a background thread. Files are written under a temporary name and renamed into place,
+# so a crash never leaves a partly written checkpoint. Checkpoints are in the same format as NEAT's Checkpointer, or are
+# compact checkpoints, and old ones are deleted, keeping the 'keep' most recent and those of every 'keep_every'th
+# generation
+class AsyncCheckpointer:
+    def __init__(self, directory, generation_interval=CHECKPOINT_GENERATIONS, time_interval=CHECKPOINT_MINUTES * 60,
+                 keep=CHECKPOINT_KEEP, keep_every=CHECKPOINT_KEEP_EVERY, on_save=None,
+                 compact=CHECKPOINT_FORMAT == "compact"):
+        self.directory = directory
+        self.generation_interval = generation_interval  # Max generations between checkpoints, or None
+        self.time_interval = time_interval  # Max seconds between checkpoints, or None
+        self.keep = keep  # Number of most recent checkpoints kept
+        self.keep_every = keep_every  # Checkpoints of generations that are a multiple of this are also kept, if not 0
+        self.on_save = on_save  # Function called with the path, generation and best fitness of each checkpoint written
+        self.compact = compact  # Whether checkpoints are saved as compact checkpoints
+        self.last_generation = None  # Generation of the last checkpoint taken
+        self.last_time = time.monotonic()  # Time the last checkpoint was taken
+
+        self.queue = queue.Queue()  # Checkpoints waiting to be written
+        self.thread = None
+        self.error = None  # Exception raised while writing, re-raised when the checkpointer is closed
+
+    # Takes a checkpoint if enough generations or time have passed since the last one
+    def end_generation(self, config, population, species_set, generation, best_genome):
+        if self.last_generation is None:
+            self.last_generation = generation
+
+        due = self.time_interval is not None and time.monotonic() - self.last_time >= self.time_interval
+        due |= self.generation_interval is not None and generation - self.last_generation >= self.generation_interval
+        if due:
+            self.save(config, population, species_set, generation, best_genome)
+
+    # Takes a checkpoint, which is written in the background
+    def save(self, config, population, species_set, generation, best_genome):
+        self.last_generation = generation
+        self.last_time = time.monotonic()
+
+        # Compact checkpoints are written as they are, since they are memory mapped when loaded
+        if self.compact:
+            data = encode(generation, config, population, species_set, random.getstate(), best_genome)
+        else:
+            data = pickle.dumps((generation, config, population, species_set, random.getstate()),
+                                pickle.HIGHEST_PROTOCOL)
+        best = pickle.dumps(best_genome, pickle.HIGHEST_PROTOCOL) if best_genome is not None else None
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.write_checkpoints, name="checkpointer", daemon=True)
+            self.thread.start()
+        best_fitness = best_genome.fitness if best_genome is not None else None
+        self.queue.put((generation, data, best, best_fitness, not self.compact))
+
+    # Waits for every checkpoint taken to be written, then stops the background thread
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    # Writes checkpoints as they are taken, run by the background thread
+    def write_checkpoints(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            generation, data, best, best_fitness, compress = item
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                path = f"{self.directory}/gen-{generation}"
+                write_atomic(path, gzip.compress(data, compresslevel=5) if compress else data)
+                if best is not None:
+                    write_atomic(f"{self.directory}/best.pickle", best)
+
+                if self.on_save is not None:
+                    self.on_save(path, generation, best_fitness)
+                self.remove_old()
+            except Exception as error:
+                self.error = error
+
+    # Deletes checkpoints that aren't kept by the retention policy
+    def remove_old(self):
+        generations = checkpoint_generations(self.directory)
+        for generation in generations[:-max(self.keep, 1)]:  # The latest checkpoint is always kept
+            if not (self.keep_every and generation % self.keep_every == 0):
+                try:
+                    os.remove(f"{self.directory}/gen-{generation}")
+                except FileNotFoundError:
+                    pass
+
+
+# Returns sorted list of the generations of the checkpoints in a directory
+def checkpoint_generations(directory):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+    return sorted(int(match.group(1)) for match in map(re.compile(r"gen-(\d+)$").match, names) if match)
+
+
+# Returns path of the latest checkpoint in a directory, or None if there are none
+def latest_checkpoint(directory):
+    generations = checkpoint_generations(directory)
+    return f"{directory}/gen-{generations[-1]}" if generations else None
+
+
+# Writes data to a file by writing it to a temporary file then renaming it, so the file is never partly written
+def write_atomic(path, data):
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temp, path)
+
+
+# Restores the population saved in a checkpoint, which can be either a NEAT checkpoint or a compact checkpoint
+def restore_checkpoint(path):
+    if is_compact(path):
+        with CompactCheckpoint(path) as checkpoint:
+            return checkpoint.restore()
+
+    return Checkpointer.restore_checkpoint(path)
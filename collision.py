@@ -0,0 +1,129 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Broad-phase replacement for pygame.sprite.groupcollide, returning the same dictionary of rect collisions
+# Instead of comparing every sprite in group1 with every sprite in group2, sprites in group2 are first checked against
+# the bounding rect of group1, and only the few that overlap it are compared with the sprites in group1. Since all
+# planes share one x column and birds only spend a few ticks crossing it, most ticks need no comparisons at all.
+# As with groupcollide, sprites in group2 killed by dokill2 aren't reported against later sprites in group1.
+# If pixel_perfect is True, rect collisions are then checked for pixel perfect collisions using PackedMasks
+def sweep_collide(group1, group2, dokill1, dokill2, pixel_perfect=False):
+    sprites1 = group1.sprites()
+    if not sprites1:
+        return {}
+
+    rects1 = [sprite.rect for sprite in sprites1]
+    extent = rects1[0].unionall(rects1)  # Bounding rect of every sprite in group1
+
+    # Compare sprites in group2 that overlap the bounding rect with every sprite in group1
+    collided = {}
+    for sprite2 in group2.sprites():
+        rect = sprite2.rect
+        if rect.left < extent.right and rect.right > extent.left \
+                and rect.top < extent.bottom and rect.bottom > extent.top:
+            nums = rect.collidelistall(rects1)
+            if pixel_perfect and nums:
+                nums = PackedMasks.filter_collisions(sprites1, nums, sprite2)
+
+            for num in nums:
+                collided.setdefault(num, []).append(sprite2)
+
+    # Create dictionary in the same order as groupcollide
+    crashed = {}
+    killed = set()  # Sprites in group2 killed by earlier sprites in group1
+    for num in sorted(collided):
+        sprites2 = [sprite2 for sprite2 in collided[num] if sprite2 not in killed] if killed else collided[num]
+        if not sprites2:
+            continue
+
+        sprite1 = sprites1[num]
+        crashed[sprite1] = sprites2
+
+        if dokill1:
+            sprite1.kill()
+        if dokill2:
+            for sprite2 in sprites2:
+                sprite2.kill()
+            killed.update(sprites2)
+
+    return crashed
+
+
+# Pixel perfect collision between masks packed into rows of 64-bit words
+# For a pair of masks at a given horizontal offset, every possible vertical offset is tested in one vectorised
+# operation, and the result is cached. Since every plane shares one mask and birds cycle through eight, checking a
+# bird against any number of planes is then a single array lookup. Gives the same result as Mask.overlap
+class PackedMasks:
+    rows = {}  # Rows of each mask as integers, where bit x is set if pixel x of the row is set
+    profiles = {}  # Whether two masks overlap at each vertical offset, keyed by both masks and the horizontal offset
+
+    # Returns boolean array of whether mask2 overlaps mask1 when offset from it by dx and each of the values in dy
+    @classmethod
+    def overlaps(cls, mask1, mask2, dx, dy):
+        height1 = mask1.get_size()[1]
+        height2 = mask2.get_size()[1]
+        profile = cls.profile(mask1, mask2, dx)
+
+        dy = np.asarray(dy)
+        in_range = (dy > -height2) & (dy < height1)
+        return in_range & profile[np.clip(dy + height2 - 1, 0, len(profile) - 1)]
+
+    # Returns the numbers of the sprites in sprites1 that are pixel perfect collisions with sprite2
+    @classmethod
+    def filter_collisions(cls, sprites1, nums, sprite2):
+        # Group sprites that share a mask and x coordinate, so each group can be tested at once
+        groups = {}
+        for num in nums:
+            sprite1 = sprites1[num]
+            groups.setdefault((sprite1.mask, sprite1.rect.x), []).append(num)
+
+        collided = []
+        for (mask1, x), group in groups.items():
+            dy = [sprite2.rect.y - sprites1[num].rect.y for num in group]
+            overlaps = cls.overlaps(mask1, sprite2.mask, sprite2.rect.x - x, dy)
+            collided += [num for num, overlap in zip(group, overlaps) if overlap]
+
+        return sorted(collided)
+
+    # Returns boolean array of whether mask2 overlaps mask1 at each vertical offset, from -(height2 - 1) to height1 - 1
+    @classmethod
+    def profile(cls, mask1, mask2, dx):
+        key = (mask1, mask2, dx)
+        try:
+            return cls.profiles[key]
+        except KeyError:
+            pass
+
+        width1, height1 = mask1.get_size()
+        num_words = (width1 + 63) // 64
+
+        # Shift rows of mask2 so they line up with mask1, then pack both masks into words
+        rows2 = [row << dx if dx >= 0 else row >> -dx for row in cls.get_rows(mask2)]
+        words1 = pack(cls.get_rows(mask1), num_words)
+        words2 = pack(rows2, num_words)
+
+        # Pad mask2 with empty rows so every vertical offset is a window of height1 rows
+        padding = np.zeros((height1 - 1, num_words), dtype=np.uint64)
+        windows = sliding_window_view(np.concatenate((padding, words2, padding)), height1, axis=0)
+
+        # Window k lines up with mask1 when mask2 is offset by height1 - 1 - k, so reverse to order by offset
+        profile = np.any(windows & words1.T, axis=(1, 2))[::-1]
+        cls.profiles[key] = profile
+        return profile
+
+    # Returns the rows of a mask as integers
+    @classmethod
+    def get_rows(cls, mask):
+        try:
+            return cls.rows[mask]
+        except KeyError:
+            width, height = mask.get_size()
+            cls.rows[mask] = [sum(1 << x for x in range(width) if mask.get_at((x, y))) for y in range(height)]
+            return cls.rows[mask]
+
+
+# Returns array of the given rows split into 64-bit words, ignoring bits past the end of the last word
+def pack(rows, num_words):
+    return np.array([[(row >> (64 * num)) & 0xFFFFFFFFFFFFFFFF for num in range(num_words)] for row in rows],
+                    dtype=np.uint64).reshape(len(rows), num_words)
@@ -0,0 +1,311 @@
+import gzip
+import hashlib
+import io
+import math
+import mmap
+import os
+import pickle
+import random
+import tempfile
+
+import numpy as np
+from neat.population import Population
+
+# Header of a compact checkpoint: magic string, version, generation, best fitness (NaN if unknown), index of the best
+# genome in the genome table (-1 if none), SHA-256 hash of the config, number of genomes, nodes and connections, and the
+# sizes of the names, config and state sections
+HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("generation", "<i8"), ("best_fitness", "<f8"),
+                   ("best_index", "<i8"), ("config_hash", "S32"), ("genomes", "<u8"), ("nodes", "<u8"),
+                   ("connections", "<u8"), ("names_size", "<u8"), ("config_size", "<u8"), ("state_size", "<u8")])
+MAGIC = b"BSCP"
+VERSION = 1
+
+# Rows of the genome, node and connection tables. Each genome's nodes and connections are stored in order, ending at
+# its 'node_end' and 'connection_end'. A genome's fitness is stored as a float, along with whether it was None, a float
+# or an int. Node keys are stored as 32-bit ints, and activation and aggregation functions as indices into the list of
+# names
+GENOME = np.dtype([("key", "<i8"), ("fitness", "<f8"), ("fitness_type", "u1"), ("node_end", "<u8"),
+                   ("connection_end", "<u8")])
+NODE = np.dtype([("key", "<i4"), ("bias", "<f8"), ("response", "<f8"), ("activation", "u1"), ("aggregation", "u1")])
+CONNECTION = np.dtype([("input", "<i4"), ("output", "<i4"), ("weight", "<f8"), ("enabled", "?")])
+
+FITNESS_TYPES = [type(None), float, int]
+GENOME_KEYS = range(-2 ** 63, 2 ** 63)
+NODE_KEYS = range(-2 ** 31, 2 ** 31)
+GENOME_ATTRIBUTES = {"key", "connections", "nodes", "fitness"}
+NODE_ATTRIBUTES = {"key", "bias", "response", "activation", "aggregation"}
+CONNECTION_ATTRIBUTES = {"key", "weight", "enabled"}
+CONFIG_SECTIONS = ["genome_config", "species_set_config", "stagnation_config", "reproduction_config"]
+
+
+# Checkpoint that stores genomes as flat tables of node and connection genes instead of pickled objects
+# The file starts with a fixed size header holding the generation, best fitness and config hash, followed by the genome,
+# node and connection tables, the activation and aggregation function names, the pickled config, and the rest of the
+# checkpoint pickled with each genome replaced by its row in the genome table. The file is memory mapped when opened
+# and nothing else is read until it is used, so the header or best genome can be read without loading the population.
+# Genomes that don't fit in the tables, such as those of other genome types, are pickled in the state instead
+class CompactCheckpoint:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = np.frombuffer(self.data, HEADER, 1)[0]
+        if header["magic"] != MAGIC or header["version"] != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} compact checkpoint")
+
+        self.generation = int(header["generation"])
+        self.best_fitness = float(header["best_fitness"])  # NaN if the fitness of the best genome isn't known
+        self.best_index = int(header["best_index"])
+        self.config_hash = header["config_hash"].hex()
+
+        # Tables are views of the mapped file, so genes are only read when a genome is built from them
+        offset = HEADER.itemsize
+        self.genomes = np.frombuffer(self.data, GENOME, int(header["genomes"]), offset)
+        offset += self.genomes.nbytes
+        self.nodes = np.frombuffer(self.data, NODE, int(header["nodes"]), offset)
+        offset += self.nodes.nbytes
+        self.connections = np.frombuffer(self.data, CONNECTION, int(header["connections"]), offset)
+        offset += self.connections.nbytes
+
+        self.names = bytes(self.data[offset:offset + header["names_size"]]).decode().split("\n")
+        offset += int(header["names_size"])
+        self.config_section = (offset, offset + int(header["config_size"]))
+        offset += int(header["config_size"])
+        self.state_section = (offset, offset + int(header["state_size"]))
+
+        self._config = None
+
+    # Config stored in the checkpoint, unpickled the first time it is used
+    @property
+    def config(self):
+        if self._config is None:
+            start, end = self.config_section
+            self._config = pickle.loads(self.data[start:end])
+        return self._config
+
+    # Returns the best genome saved with the checkpoint, or None if it wasn't saved
+    def best_genome(self):
+        return self.genome(self.best_index) if self.best_index >= 0 else None
+
+    # Builds the genome in the given row of the genome table
+    def genome(self, index):
+        config = self.config
+        genome_config = config.genome_config
+        row = self.genomes[index]
+        node_start = int(self.genomes[index - 1]["node_end"]) if index else 0
+        connection_start = int(self.genomes[index - 1]["connection_end"]) if index else 0
+
+        genome = config.genome_type(int(row["key"]))
+        fitness_type = FITNESS_TYPES[row["fitness_type"]]
+        genome.fitness = fitness_type(row["fitness"]) if fitness_type is not type(None) else None
+
+        nodes = self.nodes[node_start:row["node_end"]]
+        for key, bias, response, activation, aggregation in zip(*(nodes[field].tolist() for field in NODE.names)):
+            node = genome_config.node_gene_type(key)
+            node.bias = bias
+            node.response = response
+            node.activation = self.names[activation]
+            node.aggregation = self.names[aggregation]
+            genome.nodes[key] = node
+
+        connections = self.connections[connection_start:row["connection_end"]]
+        for node_in, node_out, weight, enabled in zip(*(connections[field].tolist() for field in CONNECTION.names)):
+            connection = genome_config.connection_gene_type((node_in, node_out))
+            connection.weight = weight
+            connection.enabled = enabled
+            genome.connections[connection.key] = connection
+
+        return genome
+
+    # Returns the generation, config, population, species set and random state saved in the checkpoint, in the same
+    # form as they are pickled in a NEAT checkpoint
+    def load(self):
+        genomes = {}  # Genomes built so far, by row, so genomes shared by the population and species stay shared
+
+        config = self.config
+        sections = {section: getattr(config, section) for section in CONFIG_SECTIONS}
+
+        def persistent_load(index):
+            if isinstance(index, str):
+                return sections[index]
+            if index not in genomes:
+                genomes[index] = self.genome(index)
+            return genomes[index]
+
+        start, end = self.state_section
+        unpickler = pickle.Unpickler(io.BytesIO(self.data[start:end]))
+        unpickler.persistent_load = persistent_load
+        population, species_set, random_state = unpickler.load()
+
+        return self.generation, config, population, species_set, random_state
+
+    # Restores the population saved in the checkpoint, in the same way as NEAT's Checkpointer.restore_checkpoint
+    def restore(self):
+        generation, config, population, species_set, random_state = self.load()
+        random.setstate(random_state)
+        return Population(config, (population, species_set, generation))
+
+    # Closes the mapped file. Tables and slices of them can't be used after the checkpoint is closed
+    def close(self):
+        self.genomes = self.nodes = self.connections = None
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Pickler that replaces genomes that fit in the genome tables with their row, adding them to the tables
+# Sections of the config, which the species set refers to, are replaced by their name so they stay shared with the
+# config when the checkpoint is loaded
+class TablePickler(pickle.Pickler):
+    def __init__(self, file, config):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.sections = {id(getattr(config, section)): section for section in CONFIG_SECTIONS}
+        genome_config = config.genome_config
+        self.genome_type = config.genome_type
+        self.node_type = genome_config.node_gene_type
+        self.connection_type = genome_config.connection_gene_type
+        self.rows = {}  # Row of each genome added, keyed by id
+        self.genomes = []  # Genomes added, kept so their ids aren't reused
+        self.names = {}  # Index of each function name
+
+    def persistent_id(self, obj):
+        if type(obj) is not self.genome_type:
+            return self.sections.get(id(obj))
+
+        try:
+            return self.rows[id(obj)]
+        except KeyError:
+            if not self.fits(obj):
+                return None
+
+            for node in obj.nodes.values():
+                self.names.setdefault(node.activation, len(self.names))
+                self.names.setdefault(node.aggregation, len(self.names))
+
+            self.rows[id(obj)] = len(self.genomes)
+            self.genomes.append(obj)
+            return self.rows[id(obj)]
+
+    # Returns whether every part of the genome can be stored in the tables without changing it
+    def fits(self, genome):
+        if vars(genome).keys() != GENOME_ATTRIBUTES or type(genome.key) is not int or genome.key not in GENOME_KEYS:
+            return False
+        if type(genome.fitness) not in FITNESS_TYPES or (type(genome.fitness) is int and
+                                                          float(genome.fitness) != genome.fitness):
+            return False
+
+        names = set(self.names)
+        for key, node in genome.nodes.items():
+            if (type(node) is not self.node_type or vars(node).keys() != NODE_ATTRIBUTES or type(key) is not int or
+                    key not in NODE_KEYS or node.key != key or type(node.bias) is not float or
+                    type(node.response) is not float or type(node.activation) is not str or
+                    type(node.aggregation) is not str or "\n" in node.activation + node.aggregation):
+                return False
+            names.update((node.activation, node.aggregation))
+
+        if len(names) > 256:  # Function names are stored as one byte
+            return False
+
+        for key, connection in genome.connections.items():
+            if (type(connection) is not self.connection_type or vars(connection).keys() != CONNECTION_ATTRIBUTES or
+                    type(key) is not tuple or len(key) != 2 or connection.key != key or
+                    any(type(node) is not int or node not in NODE_KEYS for node in key) or
+                    type(connection.weight) is not float or type(connection.enabled) is not bool):
+                return False
+
+        return True
+
+    # Returns the genome, node and connection tables of the genomes added
+    def tables(self):
+        genomes = np.zeros(len(self.genomes), GENOME)
+        nodes = np.zeros(sum(len(genome.nodes) for genome in self.genomes), NODE)
+        connections = np.zeros(sum(len(genome.connections) for genome in self.genomes), CONNECTION)
+
+        genomes["key"] = [genome.key for genome in self.genomes]
+        genomes["fitness"] = [math.nan if genome.fitness is None else genome.fitness for genome in self.genomes]
+        genomes["fitness_type"] = [FITNESS_TYPES.index(type(genome.fitness)) for genome in self.genomes]
+        genomes["node_end"] = np.cumsum([len(genome.nodes) for genome in self.genomes])
+        genomes["connection_end"] = np.cumsum([len(genome.connections) for genome in self.genomes])
+
+        node_genes = [node for genome in self.genomes for node in genome.nodes.values()]
+        nodes["key"] = [node.key for node in node_genes]
+        nodes["bias"] = [node.bias for node in node_genes]
+        nodes["response"] = [node.response for node in node_genes]
+        nodes["activation"] = [self.names[node.activation] for node in node_genes]
+        nodes["aggregation"] = [self.names[node.aggregation] for node in node_genes]
+
+        connection_genes = [connection for genome in self.genomes for connection in genome.connections.values()]
+        connections["input"] = [connection.key[0] for connection in connection_genes]
+        connections["output"] = [connection.key[1] for connection in connection_genes]
+        connections["weight"] = [connection.weight for connection in connection_genes]
+        connections["enabled"] = [connection.enabled for connection in connection_genes]
+
+        return genomes, nodes, connections
+
+
+# Returns a compact checkpoint of the given population, in the same form as a NEAT checkpoint with the best genome added
+def encode(generation, config, population, species_set, random_state, best_genome=None):
+    state = io.BytesIO()
+    pickler = TablePickler(state, config)
+    pickler.dump((population, species_set, random_state))
+
+    # Add the best genome to the tables if it isn't already in them, unless it has to be pickled
+    # If there is no best genome, the best fitness in the population is used
+    best_index = pickler.persistent_id(best_genome) if best_genome is not None else None
+    if best_genome is not None:
+        best_fitness = best_genome.fitness
+    else:
+        best_fitness = max((genome.fitness for genome in population.values() if genome.fitness is not None),
+                           default=None)
+    best_fitness = math.nan if best_fitness is None else best_fitness
+    best_index = -1 if best_index is None else best_index
+
+    genomes, nodes, connections = pickler.tables()
+    names = "\n".join(pickler.names).encode()
+    config_data = pickle.dumps(config, pickle.HIGHEST_PROTOCOL)
+
+    header = np.array([(MAGIC, VERSION, generation, best_fitness, best_index, bytes.fromhex(config_hash(config)),
+                        len(genomes), len(nodes), len(connections), len(names), len(config_data),
+                        state.getbuffer().nbytes)], HEADER)
+
+    return b"".join((header.tobytes(), genomes.tobytes(), nodes.tobytes(), connections.tobytes(), names, config_data,
+                     state.getvalue()))
+
+
+# Returns the SHA-256 hash of a config, as a hex string, so checkpoints can be matched to the config they were made with
+# The config is hashed in the form NEAT writes it to a file, which doesn't depend on how its file was formatted
+def config_hash(config):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "config")
+        config.save(path)
+        with open(path, "rb") as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+
+# Returns whether the file at the given path is a compact checkpoint
+def is_compact(path):
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+# Converts a NEAT checkpoint to a compact checkpoint, optionally storing a best genome with it
+def to_compact(path, compact_path, best_genome=None):
+    with gzip.open(path) as file:
+        generation, config, population, species_set, random_state = pickle.load(file)
+
+    with open(compact_path, "wb") as file:
+        file.write(encode(generation, config, population, species_set, random_state, best_genome))
+
+
+# Converts a compact checkpoint to a NEAT checkpoint, which can be restored by NEAT's Checkpointer
+def to_neat(compact_path, path):
+    with CompactCheckpoint(compact_path) as checkpoint:
+        data = checkpoint.load()
+
+    with gzip.open(path, "w", compresslevel=5) as file:
+        pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
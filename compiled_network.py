@@ -0,0 +1,95 @@
+import math
+from collections import OrderedDict
+
+from neat.graphs import feed_forward_layers
+
+from settings import *
+
+
+# Feed-forward network compiled from a genome into a straight-line Python function
+# Disabled connections and nodes that can't reach an output are left out, and the weights and biases are written
+# directly into the generated code. Gives the same outputs as NEAT's FeedForwardNetwork
+class CompiledNetwork:
+    cache = OrderedDict()  # Compiled networks of recently used genomes, keyed by the genome's structure
+
+    def __init__(self, function, source):
+        self.activate = function  # Function that takes a list of inputs and returns a list of outputs
+        self.source = source  # Generated source code of the function
+
+    # Creates compiled network from a genome, reusing the compiled function if the genome has been compiled before
+    @classmethod
+    def create(cls, genome, config):
+        key = genome_key(genome, config)
+        try:
+            network = cls.cache.pop(key)
+        except KeyError:
+            network = cls(*compile_genome(genome, config))
+
+        # Store network as the most recently used, removing the least recently used network if the cache is full
+        cls.cache[key] = network
+        if len(cls.cache) > COMPILE_CACHE_SIZE:
+            cls.cache.popitem(last=False)
+
+        return network
+
+
+# Returns a hashable tuple of the parts of a genome that affect its network, so identical networks have equal keys
+# Only the nodes that are evaluated, and the connections into them, are included, so genomes that only differ in
+# disabled connections or in nodes that can't reach an output still have equal keys
+def genome_key(genome, config):
+    genome_config = config.genome_config
+    connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+    used = set()
+    for layer in feed_forward_layers(genome_config.input_keys, genome_config.output_keys, connections):
+        used.update(layer)
+
+    nodes = tuple(sorted((key, ng.bias, ng.response, ng.activation, ng.aggregation)
+                         for key, ng in genome.nodes.items() if key in used))
+    connections = tuple(sorted((key, genome.connections[key].weight) for key in connections if key[1] in used))
+
+    return nodes, connections
+
+
+# Generates and compiles the activate function of a genome's network
+# Returns the function and its source code
+def compile_genome(genome, config):
+    genome_config = config.genome_config
+    connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+    functions = {"exp": math.exp}  # Functions that can be called by the generated code
+
+    # Unpack the inputs into one variable per input node
+    names = {key: f"i{num}" for num, key in enumerate(genome_config.input_keys)}
+    lines = ["def activate(inputs):",
+             f"    {', '.join(names.values())}, = inputs"]
+
+    # Calculate the value of each node in the order NEAT evaluates them
+    for layer in feed_forward_layers(genome_config.input_keys, genome_config.output_keys, connections):
+        for node in layer:
+            ng = genome.nodes[node]
+            links = [f"{names[inode]} * {genome.connections[(inode, onode)].weight!r}"
+                     for inode, onode in connections if onode == node]
+            names[node] = f"n{node}"
+
+            if ng.aggregation == "sum":
+                total = f"({' + '.join(links)})"
+            else:
+                functions[f"aggregate_{ng.aggregation}"] = genome_config.aggregation_function_defs.get(ng.aggregation)
+                total = f"aggregate_{ng.aggregation}([{', '.join(links)}])"
+
+            z = f"{ng.bias!r} + {total}" if ng.response == 1.0 else f"{ng.bias!r} + {ng.response!r} * {total}"
+
+            if ng.activation == "sigmoid":  # Sigmoid is written out in full, as it's the only activation used
+                lines += [f"    z = 5.0 * ({z})",
+                          f"    {names[node]} = 1.0 / (1.0 + exp(-(60.0 if z > 60.0 else -60.0 if z < -60.0 else z)))"]
+            else:
+                functions[f"activate_{ng.activation}"] = genome_config.activation_defs.get(ng.activation)
+                lines.append(f"    {names[node]} = activate_{ng.activation}({z})")
+
+    # Outputs that can't be reached from the inputs are always 0
+    outputs = [names.get(key, "0.0") for key in genome_config.output_keys]
+    lines.append(f"    return [{', '.join(outputs)}]")
+
+    source = "\n".join(lines) + "\n"
+    exec(compile(source, f"<genome {genome.key}>", "exec"), functions)
+
+    return functions["activate"], source
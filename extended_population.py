@@ -1,21 +1,29 @@
-import csv
 import os
 import shutil
 
 from neat.checkpoint import *
 from neat.population import *
 
+from checkpointing import AsyncCheckpointer
+from profiling import NULL_TIMER
+from registry import REGISTRY
+
 
 # Class that extends functionality of NEAT's own Population object
 # Allows exiting training when needed
-# Automatically saves population and best genome
+# Automatically saves population and best genome, every few generations and when training ends
+# 'on_save' is called with the path, generation and best fitness of each checkpoint saved, and links the instance to
+# the checkpoint in the index by default
 class ExtendedPopulation(Population):
-    def __init__(self, config, name, initial_state=None):
+    def __init__(self, config, name, initial_state=None, on_save=None):
         super().__init__(config, initial_state)
         self.running = True
         self.name = name
         self.filepath = f"ai-instances/{name}"
-        self.checkpoint = Checkpointer(None, None, f"{self.filepath}/gen-")
+        if on_save is None:
+            on_save = lambda *save: set_instance_path(name, *save)
+        self.checkpointer = AsyncCheckpointer(self.filepath, on_save=on_save)
+        self.profiler = None  # GenerationProfiler that times each generation, if timing is turned on
 
     def run(self, fitness_function, n=None):
         """
@@ -37,9 +45,12 @@ class ExtendedPopulation(Population):
                 or the configuration object.
                 """
 
+        timer = self.profiler.generation if self.profiler else NULL_TIMER
+
         k = 0
         while (n is None or k < n) and self.running:
             k += 1
+            timer.begin()
 
             self.reporters.start_generation(self.generation)
 
@@ -48,6 +59,7 @@ class ExtendedPopulation(Population):
 
             # Evaluate all genomes using the user-provided function.
             fitness_function(list(iteritems(self.population)), self.config)
+            timer.mark("evaluate")
 
             # Gather and report statistics.
             best = None
@@ -55,6 +67,7 @@ class ExtendedPopulation(Population):
                 if best is None or g.fitness > best.fitness:
                     best = g
             self.reporters.post_evaluate(self.config, self.population, self.species, best)
+            timer.mark("statistics")
 
             # Track the best genome ever seen.
             if self.best_genome is None or best.fitness > self.best_genome.fitness:
@@ -75,6 +88,7 @@ class ExtendedPopulation(Population):
             # Create the next generation from the current generation.
             self.population = self.reproduction.reproduce(self.config, self.species,
                                                           self.config.pop_size, self.generation)
+            timer.mark("reproduce")
 
             # Check for complete extinction.
             if not self.species.species:
@@ -91,84 +105,49 @@ class ExtendedPopulation(Population):
 
             # Divide the new population into species.
             self.species.speciate(self.config, self.population, self.generation)
+            timer.mark("speciate")
 
             self.reporters.end_generation(self.config, self.population, self.species)
+            timer.mark("reporters")
+
+            # Save the population of the next generation if a checkpoint is due
+            self.checkpointer.end_generation(self.config, self.population, self.species, self.generation + 1,
+                                             self.best_genome)
+            timer.mark("checkpoint")
+
+            # Log the time spent in each phase of the generation
+            if self.profiler:
+                self.profiler.end_generation(self.generation)
 
             self.generation += 1
 
         if self.config.no_fitness_termination:
             self.reporters.found_solution(self.config, self.generation, self.best_genome)
 
-        # Update index to link ai instance with
-        newfile = []
-        # Read index and add new link for current file
-        with open("ai-instances/index.csv") as csvfile:
-            reader = csv.reader(csvfile)
-            exists = False
-            for row in reader:
-                try:
-                    row_name = row[0].lower()
-                except IndexError:
-                    row_name = None
-
-                if row_name == self.name.lower():
-                    try:
-                        shutil.rmtree(self.filepath)
-                    except FileNotFoundError:
-                        pass
-
-                    newfile.append([self.name, f"{self.filepath}/gen-{self.generation}"])
-                    exists = True
-                else:
-                    newfile.append(row)
-
-            if not exists:
-                newfile.append([self.name, f"{self.filepath}/gen-{self.generation}"])
-
-        newfile = filter(None, newfile)
-
-        # Write new index file
-        with open("ai-instances/index.csv", "w") as csvfile:
-            writer = csv.writer(csvfile)
-            for row in newfile:
-                writer.writerow(row)
-
-        # Save population and best genome to file
-        try:
-            os.mkdir(self.filepath)
-        except FileExistsError:
-            pass
-        finally:
-            self.checkpoint.save_checkpoint(self.config, self.population, self.species, self.generation)
-            with open(f"{self.filepath}/best.pickle", "wb") as file:
-                pickle.dump(self.best_genome, file)
+        # Save population and best genome, waiting for every checkpoint to be written
+        self.checkpointer.save(self.config, self.population, self.species, self.generation, self.best_genome)
+        self.checkpointer.close()
 
     # Creates ExtendedPopulation object from normal Population object
     @classmethod
-    def from_population(cls, population, name):
-        return cls(population.config, name, (population.population, population.species, population.generation))
+    def from_population(cls, population, name, on_save=None):
+        return cls(population.config, name, (population.population, population.species, population.generation),
+                   on_save)
 
 
-# Return list of instance names stored in index
-def get_instance_names():
-    with open("ai-instances/index.csv") as csvfile:
-        reader = csv.reader(csvfile)
-        names = []
-        for row in reader:
-            try:
-                names.append(row[0])
-            except IndexError:
-                pass
+# Links an instance to the checkpoint at the given path in the index, adding the instance if it isn't in the index
+def set_instance_path(name, path, generation=None, best_fitness=None):
+    REGISTRY.set_checkpoint(name, path, generation, best_fitness)
 
-        names = [name for name in filter(None, names)]
 
-        return names
+# Return list of instance names stored in index
+def get_instance_names():
+    return REGISTRY.names()
 
 
 # Delete save data and entry in index of given name
 def delete_instance(name):
     path = f"ai-instances/{name}"
-    index = "ai-instances/index.csv"
 
     # Delete any save data that exists
     try:
@@ -176,66 +155,29 @@ def delete_instance(name):
     except FileNotFoundError:
         pass
 
-    # End function if the instance isn't in the index file
-    if name.lower() not in [instance.lower() for instance in get_instance_names()]:
-        return
-
-    # Remove the instance's entry from the index file
-    newfile = []
-    with open(index) as file:
-        reader = csv.reader(file)
-        for row in reader:
-            try:
-                row_name = row[0]
-            except IndexError:
-                continue
-
-            if row_name.lower() == name.lower():
-                continue
-
-            newfile.append(row)
-
-    with open(index, 'w') as file:
-        writer = csv.writer(file)
-        for row in newfile:
-            writer.writerow(row)
+    # Remove the instance's entry from the index
+    REGISTRY.delete(name)
 
 
 # Rename given instance with new name
 def rename_instance(name, new_name):
-    index = "ai-instances/index.csv"
     path = f"ai-instances/{name}"
     newpath = f"ai-instances/{new_name}"
 
+    if name.lower() != new_name.lower() and REGISTRY.get(new_name) is not None:
+        print(f"An instance named {new_name} already exists. Failed to rename")
+        return
+
     try:
-        # Rename the folder containing the save data if it exists
-        os.rename(path, newpath)
+        # Rename the instance's entry in the index and the folder containing its save data together, so the entry
+        # isn't changed if the folder can't be renamed
+        renamed = REGISTRY.rename(name, new_name, path, newpath, lambda: os.rename(path, newpath))
     except FileNotFoundError:
-        # If no save data exists, delete the instance's entry from the index file and print error message
+        # If no save data exists, delete the instance's entry from the index and print error message
         print("No save data exists for this instance. Deleting from list...")
         delete_instance(name)
         return
 
-    if name.lower() in [instance.lower() for instance in get_instance_names()]:
-        # Rename instance's entry in the index file
-        newfile = []
-        with open(index) as file:
-            reader = csv.reader(file)
-            for row in reader:
-                try:
-                    row_name = row[0]
-                except IndexError:
-                    continue
-
-                if row_name.lower() == name.lower():
-                    newfile.append([new_name, f"{newpath}{row[1][len(path):]}"])
-                else:
-                    newfile.append(row)
-
-        with open(index, 'w') as file:
-            writer = csv.writer(file)
-            for row in newfile:
-                writer.writerow(row)
-    else:
-        # Print error message if there is no entry for the instance in the index file
+    if not renamed:
+        # Print error message if there is no entry for the instance in the index
         print(f"No record found for {name}. Failed to rename")
@@ -0,0 +1,66 @@
+from collections import OrderedDict
+
+from compiled_network import genome_key
+from settings import *
+
+
+# Reuses the fitness of genomes that have already been evaluated in an identical episode
+# Planes don't affect the birds or each other, so a genome's fitness only depends on its network, the seed the birds
+# are spawned from, the difficulty, the type of collision used, and the number of episodes played and how their
+# fitness is combined. Genomes are keyed by the parts of them that affect their network, so genomes carried over
+# unchanged by elitism, and identical genomes in the same generation, are only simulated once per seed. Episodes
+# without a seed are never cached
+class FitnessCache:
+    def __init__(self, function, pixel_perfect=PIXEL_PERFECT_TRAINING, max_size=FITNESS_CACHE_SIZE,
+                 episodes=TRAINING_EPISODES, aggregate=EPISODE_AGGREGATE):
+        self.function = function  # Fitness function used to evaluate genomes that aren't cached
+        self.pixel_perfect = pixel_perfect  # Whether the fitness function uses pixel perfect collision
+        self.episodes = episodes  # Number of episodes the fitness function plays for each genome
+        self.aggregate = aggregate  # How the fitness function combines the fitness of each episode
+        self.max_size = max_size
+        self.fitness = OrderedDict()  # Fitness of each genome, keyed by episode and genome, in order of last use
+        self.hits = 0  # Number of genomes whose fitness was reused
+        self.misses = 0  # Number of genomes that were simulated
+
+    # Fitness function that evaluates genomes, skipping those already cached
+    def evaluate(self, genomes, config, seed=None):
+        if seed is None:
+            return self.function(genomes, config, seed)
+
+        # Settings that affect the fitness of a genome
+        episode = (seed, AI_DIFFICULTY, self.pixel_perfect, self.episodes, self.aggregate)
+
+        # Look up each genome, grouping those that aren't cached by key so each distinct network is simulated once
+        uncached = {}
+        for genome_id, genome in genomes:
+            key = (episode, genome_key(genome, config))
+            try:
+                genome.fitness = self.fitness[key]
+                self.fitness.move_to_end(key)
+                self.hits += 1
+            except KeyError:
+                uncached.setdefault(key, []).append(genome)
+
+        if not uncached:
+            return
+
+        # Simulate one genome of each group, then copy its fitness to the rest of the group
+        try:
+            self.function([(group[0].key, group[0]) for group in uncached.values()], config, seed)
+        finally:
+            for key, group in uncached.items():
+                for genome in group[1:]:
+                    genome.fitness = group[0].fitness
+
+        for key, group in uncached.items():
+            self.fitness[key] = group[0].fitness
+            self.misses += 1
+            self.hits += len(group) - 1
+
+        # Forget the least recently used genomes
+        while len(self.fitness) > self.max_size:
+            self.fitness.popitem(last=False)
+
+    # Returns the fraction of genomes whose fitness was reused
+    def hit_rate(self):
+        return self.hits / max(self.hits + self.misses, 1)
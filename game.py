@@ -1,16 +1,26 @@
-import neat
+import pickle
 import time
-import csv
+import numpy as np
 
-import menu
+from hud import HudText
+from profiling import NULL_TIMER, TICK_PHASES, PhaseTimer
+from rendering import DirtyRenderer
 from sprites import *
-from extended_population import ExtendedPopulation, get_instance_names, pickle
+from world import World
+
+# NEAT and the modules that run the AI are imported by the functions that use them, so they aren't loaded until the AI
+# is first trained or tested, and playing the game starts faster
 
 
 class Game:
     cap = True
+    headless = False
+    pixel_perfect = PIXEL_PERFECT_TRAINING  # Whether pixel perfect collision is used when training
+    timer = NULL_TIMER  # Times each phase of the game loop
+    show_timings = False  # Whether the time spent in each phase is drawn when training
+    speed = 0  # Speed achieved when training, as a multiple of real time
 
-    def __init__(self, master, ai_control=False, training=False, quick_time=False):
+    def __init__(self, master, ai_control=False, training=False, quick_time=False, headless=False, seed=None):
         # Initialise default attributes
         self.master = master
         self.window = master.screen
@@ -18,41 +28,69 @@ class Game:
         self.ai_control = ai_control
         self.training = training
         self.quick_time = quick_time
+        self.headless = headless  # Runs the game without a window, event pump, FPS cap or drawing
         self.fps = FPS
         self.tickcount = 0
         self.score = 0
         self.running = True
+        self.network = None  # Network used to activate every player's network at once when training
+        self.observer = None  # Builds the neural network inputs of the players when the AI is playing
+        self.recorder = None  # Records the episode when the AI is tested, so it can be replayed
         self.quicktime_object = menu.QuickTime(master, self) if self.quick_time else None
 
         # Create font object
-        self.pixelfont = pygame.font.Font("game-font.ttf", 30)
+        self.pixelfont = Assets.font(30) if not self.headless else None
 
-        # Reset difficulty for Bird class
-        Bird.reset()
+        # Create text drawn on top of the game
+        if not self.headless:
+            self.hud = {name: HudText(self.pixelfont, (5, 5 + num * 35))
+                        for num, name in enumerate(("score", "gen", "alive", "speed"))}
+        self.timing_hud = []  # Text for the timings overlay, created when it is first drawn
 
-        # Initialise Sprite Groups
-        self.all = pygame.sprite.Group()
-        self.birds = pygame.sprite.Group()
-        self.players = pygame.sprite.Group()
-
-        # Assign groups to each sprite class
-        Background.containers = self.all
-        Player.containers = [self.all, self.players]
-        Bird.containers = [self.all, self.birds]
+        # Create the world the game is played in, which holds the difficulty and sprites
+        # If a seed is given, birds are spawned using a random number generator seeded with it
+        self.world = World(master.SCREENRECT, seed=seed)
+        self.all = self.world.all
+        self.birds = self.world.birds
+        self.players = self.world.players
 
         # Create instance of Background Class
-        self.background = Background()
+        self.background = Background(self.world)
+
+        # Attributes used to schedule ticks and frames when training, and to measure the speed achieved
+        self.epoch = None  # Time the current tick schedule started
+        self.epoch_ticks = 0  # Number of ticks run since the schedule started
+        self.epoch_fps = self.fps  # Tick rate of the schedule
+        self.last_frame = -1  # Number of the last frame drawn since the schedule started
+        self.speed_time = time.perf_counter()  # Time the speed was last measured
+        self.speed_ticks = 0  # Tick count when the speed was last measured
+
+        # Renderer that only redraws the parts of the window that change
+        self.renderer = DirtyRenderer(self.window, self.background) \
+            if DIRTY_RENDERING and not (self.headless or self.quick_time) else None
 
         if not ai_control:
-            self.player = Player(self)
+            self.player = Player(self.world)
             self.run()
 
     # Main game loop
     def run(self):
         while self.running:
-            if (self.cap or not self.ai_control) and not self.quick_time: self.clock.tick(self.fps)  # Cap FPS
+            timer = self.timer
+            timer.begin()
+
+            if self.training and not self.headless:
+                self.wait()  # Cap ticks per second when training
+            elif (self.cap or not self.ai_control) and not (self.quick_time or self.headless):
+                self.clock.tick(self.fps)  # Cap FPS
+            timer.mark("wait")
+
+            # Whether this tick is drawn. When training, ticks are only drawn up to RENDER_FPS times a second
+            frame = self.frame_due()
+
             self.tickcount += 1
-            self.events()
+            self.events(frame)
+            timer.mark("events")
 
             # End game when 'running' is False or there are no players left
             planes_alive = len(self.players)
@@ -60,13 +98,17 @@ class Game:
                 break
 
             self.update()
+            timer.mark("update")
 
-            if not self.quick_time:
+            if not frame:
+                pass
+            elif not self.quick_time:
                 self.draw()
             else:
                 self.quicktime_object.run()
+            timer.mark("draw")
 
-            if not self.ai_control: self.increase_difficulty()  # Don't increase difficulty for AI
+            if not self.ai_control: self.world.increase_difficulty()  # Don't increase difficulty for AI
 
             # Check for collision
             if not self.ai_control:
@@ -76,10 +118,14 @@ class Game:
                     break
             elif not self.training:
                 if pixelperfect_collision(self.players, self.birds, False, False):
+                    if self.recorder is not None:
+                        self.recorder.deaths(self.tickcount, [True] * planes_alive)
+                        self.save_recording()  # Saved before Game Over, which may end the program
                     menu.GameOver(self.master, self.score, test_ai, menu.AIScreen, self.ai_name)
                     break
             else:
-                pygame.sprite.groupcollide(self.players, self.birds, True, False)
+                sweep_collide(self.players, self.birds, True, False, self.pixel_perfect)
+            timer.mark("collision")
 
             # Increase score
             if self.tickcount % (FPS // 20) == 0:
@@ -93,11 +139,58 @@ class Game:
                     genome.fitness += 0.1 + (-1.1 * (not in_middle))
             except AttributeError:
                 pass
-
-    # Handles game events
-    def events(self):
+            timer.mark("fitness")
+            timer.end()
+
+    # Sleeps until the next tick is due when training, so ticks run at 'fps' ticks per second if the speed is capped
+    # If the game falls behind, the schedule is restarted instead of running ticks as fast as possible to catch up
+    def wait(self):
+        now = time.perf_counter()
+        if self.epoch is None or self.fps != self.epoch_fps:
+            self.restart_schedule(now)
+
+        if self.cap and not self.quick_time:
+            due = self.epoch + self.epoch_ticks / self.fps
+            if due > now:
+                time.sleep(due - now)
+            elif now - due > 0.25:
+                self.restart_schedule(now)
+
+        self.epoch_ticks += 1
+
+    # Starts a new tick schedule at the given time
+    def restart_schedule(self, now):
+        self.epoch = now
+        self.epoch_ticks = 0
+        self.epoch_fps = self.fps
+        self.last_frame = -1
+
+    # Returns whether the current tick should be drawn, and measures the speed achieved when it is
+    # Frames are numbered from the start of the tick schedule, so at 1x speed every tick is drawn
+    def frame_due(self):
+        if self.headless:
+            return False
+        if not self.training:
+            return True
+
+        now = time.perf_counter()
+        frame = int((now - self.epoch) * RENDER_FPS)
+        if frame == self.last_frame:
+            return False
+        self.last_frame = frame
+
+        # Measure the number of ticks run per second, as a multiple of real time
+        if now - self.speed_time >= 0.5:
+            Game.speed = (self.tickcount - self.speed_ticks) / (now - self.speed_time) / FPS
+            self.speed_time = now
+            self.speed_ticks = self.tickcount
+
+        return True
+
+    # Handles game events. pygame's event queue is only read if 'pump' is True
+    def events(self, pump=True):
         # Main event loop
-        self.event_list = pygame.event.get()
+        self.event_list = pygame.event.get() if pump and not self.headless else []
         for event in self.event_list:
             if event.type == pygame.QUIT:
                 self.running = False
@@ -114,6 +207,12 @@ class Game:
                         menu.PauseScreen(self.master, self, menu.AIScreen)
                     else:
                         menu.TrainingPauseScreen(self.master, self)
+
+                    # Pause screen was drawn over the game, so the whole window needs redrawing
+                    if self.renderer is not None:
+                        self.renderer.invalidate()
+                    if self.quicktime_object is not None:
+                        self.quicktime_object.invalidate()
                 if self.training:
                     if event.key == pygame.K_SPACE:
                         Game.cap = not Game.cap
@@ -123,34 +222,22 @@ class Game:
                     if event.key == pygame.K_LEFT:
                         Game.stage = (Game.stage - 1) % len(self.stages)
                         self.fps = FPS * self.stages[self.stage]
+                    if event.key == pygame.K_F3:
+                        self.toggle_timings()
 
-        try:
-            # Remove birds that have left the screen
-            birds = self.birds.sprites()
-            if birds[0].rect.right < 0:
-                birds[0].kill()
-
-            # Remove birds behind planes from birds_infront
-            bird = self.birds_infront[0]
-            if bird.rect.right < self.players.sprites()[0].rect.left:
-                self.birds_infront.pop(0)
-        except IndexError:
-            pass
-        except AttributeError:
-            pass
-
-        # Calls random spawn method 'spawnrate' times per second
-        try:
-            Bird.lastspawn += 1
-            spawn_bird = self.tickcount % (FPS // Bird.spawnrate) == 0
-        except ZeroDivisionError:
-            Bird.spawnrate = FPS  # Set spawnrate to FPS if it is set to a value greater than FPS
-            spawn_bird = self.tickcount % (FPS // Bird.spawnrate) == 0
-        finally:
-            if spawn_bird:
-                bird = Bird.random_spawn(self)
-                if bird and self.ai_control:
-                    self.birds_infront.append(bird)
+        # Remove birds that have left the screen
+        self.world.remove_offscreen()
+
+        # Remove birds behind planes from the neural network inputs
+        if self.observer is not None:
+            self.observer.remove_passed()
+
+        # Spawn birds
+        bird = self.world.spawn(self.tickcount)
+        if bird and self.observer is not None:
+            self.observer.add(bird)
+        if bird and self.recorder is not None:
+            self.recorder.spawn(self.tickcount, bird.rect.centery)
 
     # Updates game sprites
     def update(self):
@@ -158,9 +245,9 @@ class Game:
 
         # Moves plane(s) up or down depending on keyboard/neural network input(s)
         if self.ai_control:
-            for player in self.players.sprites():
-                inputs = self.get_inputs(player)
-                outputs = self.ai_players[player][0].activate(inputs)
+            players = self.players.sprites()
+            directions = []
+            for player, outputs in zip(players, self.activate(players)):
                 max_output = max(outputs)
                 if max_output >= 0.25:
                     index = outputs.index(max_output)
@@ -169,6 +256,7 @@ class Game:
                     direction = 0
 
                 player.move(direction)
+                directions.append(direction)
 
                 # Remove fitness if planes stay still for too long
                 try:
@@ -176,6 +264,9 @@ class Game:
                         self.ai_players[player][1].fitness -= 1
                 except AttributeError:
                     pass
+
+            if self.recorder is not None:
+                self.recorder.actions(directions)
         else:
             keystate = pygame.key.get_pressed()
             direction = (keystate[pygame.K_s] or keystate[pygame.K_DOWN]) - \
@@ -185,105 +276,143 @@ class Game:
 
     # Draws to and updates the window
     def draw(self):
-        self.all.draw(self.window)  # Draws all sprites to the window
-
-        # Draw score to window
-        scoretext = self.pixelfont.render(f"Score: {self.score}", False, WHITE)
-        self.window.blit(scoretext, (5, 5))
+        # Update text, which is only rendered again when it changes
+        self.hud["score"].set(f"Score: {self.score}")
+        texts = [self.hud["score"]]
 
         if self.training:
-            # Draw generation number to window
-            gentext = self.pixelfont.render(f"Gen: {self.population.generation}", False, WHITE)
-            self.window.blit(gentext, (5, 40))
+            self.hud["gen"].set(f"Gen: {self.population.generation}")  # Generation number
+            self.hud["alive"].set(f"Alive: {len(self.players)}")  # Number of planes alive
 
-            # Draw number of planes alive to window
-            alivetext = self.pixelfont.render(f"Alive: {len(self.players)}", False, WHITE)
-            self.window.blit(alivetext, (5, 75))
-
-            # Draw game speed
+            # Game speed, followed by the speed achieved
             if not self.cap:
-                speedtext = self.pixelfont.render("Unlimited", False, WHITE)
-            elif self.stage != 0:
-                speedtext = self.pixelfont.render(f"{self.stages[self.stage]}x", False, WHITE)
+                self.hud["speed"].set(f"Unlimited: {self.speed:.1f}x")
             else:
-                speedtext = self.pixelfont.render("", False, WHITE)
-
-            self.window.blit(speedtext, (5, 110))
-
-        pygame.display.update()
+                self.hud["speed"].set(f"{self.stages[self.stage]}x: {self.speed:.1f}x")
 
-    # Make game get progressively harder
-    def increase_difficulty(self):
-        Bird.vel -= (0.3 / FPS)
-        self.background.vel -= (0.2 / FPS)
+            texts += [self.hud["gen"], self.hud["alive"], self.hud["speed"]]
 
-        if Bird.spawnrate < FPS:  # Stop increasing spawnrate when it reaches FPS
-            Bird.spawnrate += (1 / FPS)
+            if self.show_timings:
+                texts += self.timing_texts()
 
-        if Bird.maxtime > 0.25:  # Stop increasing maxtime when it reaches 0.25
-            Bird.maxtime -= (0.07 / FPS)
-
-    # Returns inputs for neural network
-    def get_inputs(self, player):
-        n = NUM_INPUTS
-        inputs = [player.rect.centery] + [bird.rect.center[coord] - player.rect.center[coord]
-                                          for bird in self.birds_infront for coord in range(2)]
-
-        return inputs[:n] + [1000] * (n - len(inputs))
+        # Draw sprites and text to the window
+        if self.renderer is None:
+            self.all.draw(self.window)
+            self.window.blits([(text.image, text.rect) for text in texts], False)
+            pygame.display.update()
+        else:
+            self.renderer.draw(self.all, texts)
+
+    # Returns list of HudTexts showing the mean time spent in each phase of the game loop per tick
+    def timing_texts(self):
+        if not self.timing_hud:
+            font = Assets.font(20)
+            self.timing_hud = [HudText(font, (self.master.SCREENRECT.width - 5, 5 + num * 25), "topright")
+                               for num in range(len(TICK_PHASES) + 1)]
+
+        # Times are updated four times a second so they can be read
+        if self.tickcount % (FPS // 4) == 1 or self.timing_hud[-1].text is None:
+            means = self.timer.means()
+            lines = [f"{phase}: {means[phase]:.2f}ms" for phase in TICK_PHASES if phase in means]
+            lines.append(f"total: {sum(means.values()):.2f}ms")
+            lines += [""] * (len(self.timing_hud) - len(lines))
+            for text, line in zip(self.timing_hud, lines):
+                text.set(line)
+
+        return self.timing_hud
+
+    # Turns the timings overlay on or off, starting a timer for it if the game loop isn't already being timed
+    @classmethod
+    def toggle_timings(cls):
+        cls.show_timings = not cls.show_timings
+        if cls.show_timings and not cls.timer.enabled:
+            cls.timer = PhaseTimer()
+        elif not cls.show_timings and cls.population.profiler is None:
+            cls.timer = NULL_TIMER
+
+    # Returns the neural network outputs for each of the given players
+    def activate(self, players):
+        inputs = self.observer.build([player.rect.centery for player in players])
+        if self.network is None:  # Each player has its own network
+            return [self.ai_players[player][0].activate(row) for player, row in zip(players, inputs.tolist())]
+
+        rows = np.array([self.ai_players[player][0] for player in players])
+        return self.network.activate(inputs, rows).tolist()
+
+    # Returns rect of a plane in its starting position
+    def plane_rect(self):
+        return Assets.image("images/plane.png").get_rect(center=self.master.SCREENRECT.center)
+
+    # Saves the recording of a test so it can be replayed, if it hasn't been saved already, then removes old ones
+    def save_recording(self):
+        from recording import remove_old_recordings
+
+        if self.recorder is not None:
+            directory = f"{RECORDINGS_DIR}/{self.ai_name}"
+            self.recorder.save(f"{directory}/test-{time.strftime('%Y%m%d-%H%M%S')}.episode")
+            self.recorder = None
+            remove_old_recordings(directory, "test-", TEST_RECORDINGS_KEEP)
 
     # Creates game object for training the AI
+    # If a seed is given, birds are spawned using a random number generator seeded with it
     @classmethod
-    def from_ai(cls, genomes, config):
-        game = cls(cls.master, True, True, cls.quick_time)
-        game.ai_players = {}  # Empty dictionary to link player sprites with their networks and genomes
-        game.birds_infront = []  # List that will store all bird sprites in front of the plane
+    def from_ai(cls, genomes, config, seed=None):
+        from batch_network import BatchNetwork
+        from compiled_network import CompiledNetwork
+        from observation import ObservationBuilder
+
+        game = cls(cls.master, True, True, cls.quick_time, cls.headless, seed)
+        cls.timer.reset()  # Time each generation separately
+        game.ai_players = {}  # Empty dictionary to link player sprites with their networks (or rows) and genomes
+        game.observer = ObservationBuilder(game.plane_rect(), len(genomes))  # Tracks birds in front of planes
         game.fps = FPS * game.stages[game.stage]
 
         # Set game difficulty
-        Bird.vel = -18
-        Bird.spawnrate = 2
-        Bird.maxtime = 0.5
+        game.world.bird_vel, game.world.spawnrate, game.world.maxtime = AI_DIFFICULTY
+
+        # Large populations are activated together by a batch network, small ones by each genome's compiled network
+        if len(genomes) >= BATCH_MIN_GENOMES:
+            game.network = BatchNetwork([genome for genome_id, genome in genomes], config)
 
-        for genome_id, genome in genomes:
+        for row, (genome_id, genome) in enumerate(genomes):
             genome.fitness = 0
-            network = neat.nn.FeedForwardNetwork.create(genome, config)
-            game.ai_players[Player(game)] = [network, genome]
+            network = row if game.network is not None else CompiledNetwork.create(genome, config)
+            game.ai_players[Player(game.world)] = [network, genome]
 
         game.run()
         return game
 
 
+# Loads the population of the given AI instance, or creates a new one if it doesn't exist
+def load_population(ai_name, config):
+    from checkpointing import restore_checkpoint
+    from extended_population import ExtendedPopulation
+    from registry import REGISTRY
+
+    instance = REGISTRY.get(ai_name)
+    if instance is not None and instance.path:  # If AI instance exists, continue training
+        try:
+            population = ExtendedPopulation.from_population(restore_checkpoint(instance.path), ai_name)
+        except FileNotFoundError:
+            population = ExtendedPopulation(config, ai_name)
+
+    else:  # Else create new population
+        population = ExtendedPopulation(config, ai_name)
+
+    return population
+
+
 # Train AI
 def train_ai(master, ai_name, quick_time=False):
+    import neat
+    from profiling import GenerationProfiler
+
     # Load settings from NEAT config file
     config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
                                 neat.DefaultStagnation, CONFIG_FILE)
 
     # Create population
-    names = [name.lower() for name in get_instance_names()]
-    if ai_name.lower() in names:  # If AI instance exists, continue training
-        with open("ai-instances/index.csv") as file:
-            reader = csv.reader(file)
-
-            for row in reader:
-                try:
-                    if row[0].lower() == ai_name.lower() and len(row) > 1:
-                        filepath = row[1]
-                        checkpoint = neat.Checkpointer(None, None)
-                        population = ExtendedPopulation.from_population(checkpoint.restore_checkpoint(filepath),
-                                                                        ai_name)
-                        break
-                except IndexError:
-                    pass
-                except FileNotFoundError:
-                    population = ExtendedPopulation(config, ai_name)
-                    break
-
-            else:
-                population = ExtendedPopulation(config, ai_name)
-
-    else:  # Else create new population
-        population = ExtendedPopulation(config, ai_name)
+    population = load_population(ai_name, config)
 
     Game.master = master
     Game.population = population
@@ -291,26 +420,43 @@ def train_ai(master, ai_name, quick_time=False):
     Game.stage = 0
     Game.cap = True
     Game.quick_time = quick_time
+    Game.headless = False
+    Game.show_timings = False
+
+    # Time each phase of training if turned on, logging the times of each generation
+    if PROFILE_TRAINING:
+        population.profiler = GenerationProfiler(profile_path(ai_name))
+        Game.timer = population.profiler.ticks
+    else:
+        Game.timer = NULL_TIMER
 
     winner = population.run(Game.from_ai, 99999)  # Run AI and store best network in winner
     master.manager.switch(menu.AIScreen, master)
 
 
+# Returns path of a new timings log for the given AI instance
+def profile_path(ai_name):
+    return f"{PROFILES_DIR}/{ai_name}-{time.strftime('%Y%m%d-%H%M%S')}.csv"
+
+
 # Test AI
 def test_ai(master, ai_name):
+    import neat
+    from compiled_network import CompiledNetwork
+    from observation import ObservationBuilder
+    from recording import EpisodeRecorder
+
     # Load settings from NEAT config file
     config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
                                 neat.DefaultStagnation, CONFIG_FILE)
 
     # Create game instance and set attributes
     game = Game(master, True)
-    game.birds_infront = []  # Create empty list for tracking birds infront of plane
+    game.observer = ObservationBuilder(game.plane_rect(), 1)  # Create object for tracking birds infront of plane
     game.ai_name = ai_name
 
     # Set game difficulty
-    Bird.vel = -18
-    Bird.spawnrate = 2
-    Bird.maxtime = 0.5
+    game.world.bird_vel, game.world.spawnrate, game.world.maxtime = AI_DIFFICULTY
 
     # Load best genome
     filepath = f"ai-instances/{ai_name}/best.pickle"
@@ -323,8 +469,18 @@ def test_ai(master, ai_name):
         return
 
     # Create neural network and player sprite, then link sprite, NN, and genome together
-    network = neat.nn.FeedForwardNetwork.create(genome, config)
-    player = Player(game)
+    network = CompiledNetwork.create(genome, config)
+    player = Player(game.world)
     game.ai_players = {player: [network, genome]}
+    if TEST_RECORDINGS_KEEP:
+        game.recorder = EpisodeRecorder(1, None, game.world.bird_vel)
+
+    # Recording is saved when the plane crashes, or when the test ends before it does
+    try:
+        game.run()
+    finally:
+        game.save_recording()
+
 
-    game.run()
+# Imported last since menu depends on the classes and functions defined above
+import menu
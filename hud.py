@@ -0,0 +1,46 @@
+from collections import OrderedDict
+
+import pygame
+
+from settings import *
+
+
+# Line of text drawn on top of the game, such as the score, which is only rendered again when its text changes
+# Rendered text is cached for every font, text and colour, so values that come back, such as the number of planes
+# alive in each generation, are only ever rendered once
+class HudText:
+    cache = OrderedDict()  # Rendered text surfaces, keyed by font, text and colour, in order of last use
+
+    def __init__(self, font, pos, anchor="topleft", colour=WHITE):
+        self.font = font
+        self.pos = pos  # Position of the anchor point of the text
+        self.anchor = anchor  # Point of the text's rect that is placed at 'pos', such as "topleft" or "center"
+        self.colour = colour
+        self.text = None
+        self.image = None
+        self.rect = None
+        self.changed = False  # Whether the text has changed since it was last drawn
+
+    # Changes the text, rendering it only if it is different from the current text
+    def set(self, text):
+        if text == self.text:
+            return
+
+        self.text = text
+        self.image = self.render(self.font, text, self.colour)
+        self.rect = self.image.get_rect(**{self.anchor: self.pos})
+        self.changed = True
+
+    # Returns surface of the rendered text
+    @classmethod
+    def render(cls, font, text, colour):
+        key = (font, text, colour)
+        try:
+            cls.cache.move_to_end(key)
+            return cls.cache[key]
+        except KeyError:
+            image = font.render(text, False, colour)
+            cls.cache[key] = image
+            if len(cls.cache) > HUD_CACHE_SIZE:
+                cls.cache.popitem(last=False)  # Forget the least recently used text
+            return image
@@ -0,0 +1,267 @@
+import multiprocessing
+import os
+import pickle
+import queue
+import random
+from itertools import count
+
+import neat
+from neat.reporting import BaseReporter
+
+from checkpointing import latest_checkpoint, restore_checkpoint, write_atomic
+from extended_population import ExtendedPopulation
+from registry import REGISTRY
+from settings import *
+
+
+# Connection between an island and the coordinator, over a pair of multiprocessing queues
+# Messages are tuples whose first item is their type and second is the number of the island they are from. Islands on
+# other machines could be connected by another transport with the same two methods, such as one over a socket
+class QueueTransport:
+    def __init__(self, inbox, outbox):
+        self.inbox = inbox  # Messages sent to the island
+        self.outbox = outbox  # Messages sent to the coordinator, shared by every island
+
+    # Sends a message to the coordinator
+    def send(self, *message):
+        self.outbox.put(message)
+
+    # Returns list of the messages sent to the island that have arrived, without waiting for more
+    def receive(self):
+        messages = []
+        while True:
+            try:
+                messages.append(self.inbox.get_nowait())
+            except queue.Empty:
+                return messages
+
+
+# Reporter that reports an island's best genome to the coordinator and exchanges genomes with the other islands
+# Every 'interval' generations, copies of the island's best genomes are sent to the coordinator to be passed on to the
+# next island. Genomes received from other islands replace randomly chosen new offspring in the next generation, which
+# is then speciated again so they join the species they are closest to. Each island numbers its hidden nodes itself, so
+# immigrants' hidden nodes are given new keys by the receiving island. Islands don't wait for migrants, so islands that
+# evolve at different speeds don't hold each other up
+class MigrationReporter(BaseReporter):
+    def __init__(self, island, population, transport, interval=ISLAND_MIGRATION_INTERVAL,
+                 num_migrants=ISLAND_MIGRANTS):
+        self.island = island  # Number of the island
+        self.population = population
+        self.transport = transport
+        self.interval = interval
+        self.num_migrants = num_migrants
+        self.best_fitness = None  # Fitness of the best genome reported to the coordinator
+
+    # Reports the best genome if it has improved, and sends migrants if they are due
+    def post_evaluate(self, config, population, species, best_genome):
+        if not self.population.running:  # The generation was interrupted, so its fitness is incomplete
+            return
+
+        generation = self.population.generation
+        if self.best_fitness is None or best_genome.fitness > self.best_fitness:
+            self.best_fitness = best_genome.fitness
+            self.transport.send("best", self.island, generation, best_genome)
+
+        if (generation + 1) % self.interval == 0:
+            emigrants = sorted(population.values(), key=lambda genome: genome.fitness, reverse=True)
+            self.transport.send("migrants", self.island, emigrants[:self.num_migrants])
+
+    # Adds any migrants that have arrived to the next generation
+    def end_generation(self, config, population, species_set):
+        # Immigrants sent together come from the same island, so their nodes are given new keys together
+        immigrants = []
+        for message in self.transport.receive():
+            keys = {}  # New keys of the nodes of the island the genomes are from
+            immigrants += [(genome, keys) for genome in message[2]]
+        offspring = [key for key, genome in population.items() if genome.fitness is None]  # Elites keep their fitness
+        if not immigrants or not offspring:
+            return
+
+        # NEAT only creates the node indexer when a hidden node is first added, so start it after every node already in
+        # the population
+        if config.genome_config.node_indexer is None:
+            config.genome_config.node_indexer = count(max(key for genome in population.values()
+                                                          for key in genome.nodes) + 1)
+
+        for key, (genome, keys) in zip(random.sample(offspring, min(len(immigrants), len(offspring))), immigrants):
+            del population[key]
+            renumber_nodes(genome, config.genome_config, keys)
+            genome.key = self.new_key(population)
+            genome.fitness = None
+            population[genome.key] = genome
+
+        species_set.speciate(config, population, self.population.generation)
+
+    # NEAT's checkpoints include the population's reporters, but the island's connection only exists while it runs, so
+    # the reporter is saved as one that does nothing
+    def __reduce__(self):
+        return BaseReporter, ()
+
+    # Returns a genome key that isn't used in the population
+    def new_key(self, population):
+        key = next(self.population.reproduction.genome_indexer)
+        while key in population:
+            key = next(self.population.reproduction.genome_indexer)
+        return key
+
+
+# Gives the hidden nodes of a genome from another island new keys from this island's node indexer
+# Node keys are only meaningful within the island that created them, so keeping them would match up unrelated nodes in
+# crossover, and the island would later create nodes with keys the genome already uses. 'keys' maps the other island's
+# keys to new ones, and is shared by genomes from the same island so their common nodes keep matching keys
+def renumber_nodes(genome, genome_config, keys):
+    nodes = {}
+    for key, node in sorted(genome.nodes.items()):
+        if key in genome_config.output_keys:  # Input and output keys are the same on every island
+            keys[key] = key
+        elif key not in keys:
+            keys[key] = genome_config.get_new_node_key(nodes)
+        node.key = keys[key]
+        nodes[node.key] = node
+
+    connections = {}
+    for (in_key, out_key), connection in genome.connections.items():
+        connection.key = (keys.get(in_key, in_key), keys[out_key])
+        connections[connection.key] = connection
+
+    genome.nodes = nodes
+    genome.connections = connections
+
+
+# Trains an AI instance as several islands, each evolving its own population in a separate process
+# Islands are arranged in a ring, with each one sending migrants to the next. The coordinator passes migrants on, keeps
+# the best genome found by any island and saves it as the instance's best genome. Each island's population is saved to
+# ai-instances/<name>/island-N, and the instance is linked in the index to the latest checkpoint of the island that
+# found the best genome, so it can be tested, or trained further as one population, like any other instance
+class IslandCoordinator:
+    def __init__(self, name, num_islands=None, interval=ISLAND_MIGRATION_INTERVAL, num_migrants=ISLAND_MIGRANTS,
+                 quiet=False):
+        self.name = name
+        self.num_islands = num_islands or multiprocessing.cpu_count()
+        self.interval = interval  # Generations between migrations
+        self.num_migrants = num_migrants  # Number of genomes each island sends in each migration
+        self.quiet = quiet
+        self.checkpoints = {}  # Path, generation and best fitness of the latest checkpoint of each island
+        self.best_island = None  # Island that found the best genome
+
+        # Start from the best genome saved by previous training, if there is one
+        self.best_genome = None
+        try:
+            with open(f"ai-instances/{name}/best.pickle", "rb") as file:
+                self.best_genome = pickle.load(file)
+        except FileNotFoundError:
+            pass
+
+    # Trains every island for the given number of generations, or until interrupted
+    def run(self, generations=None, seed=None, pixel_perfect=PIXEL_PERFECT_TRAINING, episodes=TRAINING_EPISODES,
+            aggregate=EPISODE_AGGREGATE):
+        outbox = multiprocessing.Queue()
+        inboxes = [multiprocessing.Queue() for island in range(self.num_islands)]
+        processes = [multiprocessing.Process(target=run_island, name=f"island-{island}",
+                                             args=(self.name, island, QueueTransport(inboxes[island], outbox),
+                                                   generations, seed, pixel_perfect, self.interval,
+                                                   self.num_migrants, episodes, aggregate))
+                     for island in range(self.num_islands)]
+        for process in processes:
+            process.start()
+
+        # Handle messages until every island has finished. Islands save their progress when interrupted, so the
+        # coordinator keeps handling messages until they have
+        finished = set()
+        while len(finished) < len(processes):
+            try:
+                kind, island, *details = outbox.get(timeout=1)
+            except queue.Empty:
+                for island, process in enumerate(processes):
+                    if island not in finished and not process.is_alive():
+                        print(f"Island {island} stopped unexpectedly")
+                        finished.add(island)
+                continue
+            except KeyboardInterrupt:
+                continue
+
+            if kind == "migrants":
+                inboxes[(island + 1) % len(inboxes)].put((kind, island, *details))
+            elif kind == "best":
+                self.update_best(island, *details)
+            elif kind == "checkpoint":
+                self.checkpoints[island] = details
+                if island == self.best_island:
+                    self.register()
+            elif kind == "finished":
+                finished.add(island)
+
+        for process in processes:
+            process.join()
+
+    # Saves a genome reported by an island if it is the best found so far
+    def update_best(self, island, generation, genome):
+        if self.best_genome is not None and genome.fitness <= self.best_genome.fitness:
+            return
+
+        self.best_genome = genome
+        self.best_island = island
+        os.makedirs(f"ai-instances/{self.name}", exist_ok=True)
+        write_atomic(f"ai-instances/{self.name}/best.pickle", pickle.dumps(genome, pickle.HIGHEST_PROTOCOL))
+        self.register()
+
+        if not self.quiet:
+            print(f"Island {island}, generation {generation}: new best fitness {genome.fitness:.1f}")
+
+    # Links the instance to the latest checkpoint of the island that found the best genome
+    def register(self):
+        if self.best_island in self.checkpoints:
+            path, generation = self.checkpoints[self.best_island][:2]
+            REGISTRY.set_checkpoint(self.name, path, generation, self.best_genome.fitness)
+
+
+# Trains one island in a worker process, exchanging genomes with the other islands through the transport
+# Islands continue from their own latest checkpoint, or from the instance's population if they haven't been saved yet.
+# Each island uses its own seeds, so islands started from the same population evolve differently
+def run_island(name, island, transport, generations, seed, pixel_perfect, interval, num_migrants,
+               episodes=TRAINING_EPISODES, aggregate=EPISODE_AGGREGATE):
+    from simulation import HeadlessMain, PopulationSim
+
+    island_seed = None if seed is None else f"{seed}-{island}"
+    random.seed(island_seed)  # NEAT uses the global random number generator to create and mutate genomes
+
+    # Load settings from NEAT config file
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                                neat.DefaultStagnation, CONFIG_FILE)
+
+    # Create population, reporting each checkpoint to the coordinator instead of adding the island to the index
+    island_name = f"{name}/island-{island}"
+    on_save = lambda *save: transport.send("checkpoint", island, *save)
+    population = None
+    path = latest_checkpoint(f"ai-instances/{island_name}")
+    if path is None:
+        instance = REGISTRY.get(name)
+        path = instance.path if instance else None
+    if path:
+        try:
+            population = ExtendedPopulation.from_population(restore_checkpoint(path), island_name, on_save)
+        except FileNotFoundError:
+            pass
+    if population is None:
+        population = ExtendedPopulation(config, island_name, on_save=on_save)
+    elif not path.startswith(population.filepath):
+        random.seed(island_seed)  # Don't continue with the random state restored by every island from the instance
+    population.add_reporter(MigrationReporter(island, population, transport, interval, num_migrants))
+
+    PopulationSim.master = HeadlessMain(WIDTH, HEIGHT)
+    PopulationSim.pixel_perfect = pixel_perfect
+    PopulationSim.episodes = episodes
+    PopulationSim.aggregate = aggregate
+    seeds = random.Random(island_seed)
+
+    # Fitness function that stops training and saves progress when interrupted
+    def fitness_function(genomes, config):
+        try:
+            PopulationSim.from_ai(genomes, config, seeds.getrandbits(32))
+        except KeyboardInterrupt:
+            population.running = False
+
+    try:
+        population.run(fitness_function, generations)
+    finally:
+        transport.send("finished", island)
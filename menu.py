@@ -1,8 +1,8 @@
 import math
 
 from button import *
+from hud import HudText
 from game import *
-from extended_population import delete_instance, rename_instance
 
 
 # Class that extends functionality of PyGame's default Group class
@@ -20,30 +20,35 @@ class ButtonGroup(pygame.sprite.Group):
 class ScreenBase:
     def __init__(self, master, title="", titlesize=100, ypos=130):
         # Create title text
-        self.title_font = pygame.font.Font("game-font.ttf", titlesize)
-        self.title = self.title_font.render(title, False, WHITE)
+        self.title = Assets.text(title, titlesize, WHITE)
         self.title_rect = self.title.get_rect(center=(master.SCREENRECT.width // 2, ypos))
 
         self.buttons = ButtonGroup()  # Group that will contain all buttons on the screen
         self.running = True
+        self.redraw = True  # Whether the window is updated in the next frame, even if no button has changed
         self.master = master
         self.win = master.screen
         self.switch = master.manager.switch
         self.exit = master.manager.exit
 
     # Default loop containing logic for the menu
+    # The loop sleeps until input arrives, or for at most MENU_WAIT_TIMEOUT milliseconds, and the window is only updated
+    # when a button is highlighted or un-highlighted, the buttons shown change, or 'redraw' is set, so menus left open
+    # use almost no CPU
     def run(self, background=None, function=None, *args):
         if background is None:
             background = pygame.Surface(self.master.SCREENRECT.size)
             background.fill(LIGHT_BLUE)
 
         self.win.blit(background, (0, 0))
+        self.redraw = True
+        drawn = None  # Buttons and their images when the window was last updated
 
         while self.running:
             clicked = False  # Variable for representing whether or not the left mouse button has been clicked
 
             # Event loop
-            self.events = pygame.event.get()
+            self.events = wait_events(MENU_WAIT_TIMEOUT)
             for event in self.events:
                 if event.type == pygame.QUIT:
                     self.running = False
@@ -64,11 +69,25 @@ class ScreenBase:
 
             if not self.running: break
 
-            # Draw to screen
-            self.win.blit(self.title, self.title_rect)
-            self.buttons.draw(self.win)
+            # Draw to screen if anything has changed
+            state = (self.buttons, [button.image for button in self.buttons])
+            if self.redraw or state != drawn:
+                self.win.blit(self.title, self.title_rect)
+                self.buttons.draw(self.win)
 
-            pygame.display.update()
+                pygame.display.update()
+                self.redraw = False
+                drawn = state
+
+
+# Waits until at least one event is in pygame's event queue, or 'timeout' milliseconds have passed
+# Returns list of the events in the queue, which is empty if none arrived in time
+def wait_events(timeout):
+    event = pygame.event.wait(timeout)
+    if event.type == pygame.NOEVENT:
+        return []
+
+    return [event] + pygame.event.get()
 
 
 # Start Screen
@@ -95,7 +114,7 @@ class GameOver(ScreenBase):
         surf.fill(DIMMED_BLACK)
 
         # Create font for score
-        self.score_font = pygame.font.Font("game-font.ttf", 70)
+        self.score_font = Assets.font(70)
         self.score = self.score_font.render(f"Score: {score}", False, WHITE)
         self.score_rect = self.score.get_rect(center=(master.SCREENRECT.width // 2, 230))
 
@@ -245,6 +264,8 @@ class SelectAI(ScreenBase):
 
     # Method that creates buttons and divides them into pages if necessary
     def create_buttons(self):
+        from extended_population import get_instance_names
+
         names = get_instance_names()
         num_pages = math.ceil(len(names) / 5)
 
@@ -307,7 +328,7 @@ class TextInput(ScreenBase):
         self.rscreen_args = rscreen_args if rscreen_args else (self.master, self.screen)
 
         # Create font to display text input
-        self.text_font = pygame.font.Font("game-font.ttf", 70)
+        self.text_font = Assets.font(70)
         self.text = None
         self.text_rect = None
 
@@ -327,14 +348,18 @@ class TextInput(ScreenBase):
                     self.switch(self.screen, *self.screen_args, self.input)
                 elif event.key == pygame.K_BACKSPACE:
                     self.input = self.input[:-1]
+                    self.redraw = True
                 elif len(self.input) < 15 and 32 <= event.key <= 126:
                     mod_states = pygame.key.get_mods()
                     self.input += chr(event.key - (32 * (mod_states & pygame.KMOD_SHIFT)))
+                    self.redraw = True
 
-        self.text = self.text_font.render(self.input, False, WHITE)
-        self.text_rect = self.text.get_rect(center=(self.master.SCREENRECT.width // 2, 300))
-        self.win.fill(LIGHT_BLUE)
-        self.win.blit(self.text, self.text_rect)
+        # Only render the text again when it has changed
+        if self.redraw:
+            self.text = self.text_font.render(self.input, False, WHITE)
+            self.text_rect = self.text.get_rect(center=(self.master.SCREENRECT.width // 2, 300))
+            self.win.fill(LIGHT_BLUE)
+            self.win.blit(self.text, self.text_rect)
 
 
 # Quick Time Screen
@@ -342,7 +367,12 @@ class QuickTime(ScreenBase):
     def __init__(self, master, game):
         ScreenBase.__init__(self, master, "Training AI...", 80, 80)
         self.game = game
-        self.font = pygame.font.Font("game-font.ttf", 60)  # Create text font object
+        self.font = Assets.font(60)  # Text font object
+
+        # Create text for the score, generation number and number of players alive
+        self.texts = [HudText(self.font, (master.SCREENRECT.width // 2, y), "center") for y in (210, 290, 370)]
+        self.text_rects = []  # Rect of each text when it was last drawn
+        self.full = True  # Whether the whole window is redrawn in the next frame
 
         # Create button
         Button("Save and Exit to Menu", (master.SCREENRECT.width // 2, 490), 60, self.buttons,
@@ -361,30 +391,41 @@ class QuickTime(ScreenBase):
 
         self.buttons.update(clicked)  # Update buttons
 
-        # Clear window
-        self.win.fill(LIGHT_BLUE)
+        # Update score, generation number and number of players alive, which are only rendered again when they change
+        self.texts[0].set(f"Score:{self.game.score}")
+        self.texts[1].set(f"Gen:{self.game.population.generation}")
+        self.texts[2].set(f"Alive:{len(self.game.players)}")
 
-        # Draw title
-        self.win.blit(self.title, self.title_rect)
-
-        # Create and draw score
-        text = self.font.render(f"Score:{self.game.score}", False, WHITE)
-        rect = text.get_rect(center=(self.master.SCREENRECT.width // 2, 210))
-        self.win.blit(text, rect)
+        if self.full:
+            # Clear window and draw title, text and buttons
+            self.win.fill(LIGHT_BLUE)
+            self.win.blit(self.title, self.title_rect)
+            for text in self.texts:
+                self.win.blit(text.image, text.rect)
+                text.changed = False
+            self.buttons.draw(self.win)
 
-        # Create and draw generation number
-        text = self.font.render(f"Gen:{self.game.population.generation}", False, WHITE)
-        rect = text.get_rect(center=(self.master.SCREENRECT.width // 2, 290))
-        self.win.blit(text, rect)
+            pygame.display.update()
+            self.full = False
+        else:
+            # Only redraw text that has changed, and the buttons, which may have been highlighted
+            dirty = []
+            for text, rect in zip(self.texts, self.text_rects):
+                if text.changed:
+                    self.win.fill(LIGHT_BLUE, rect)
+                    self.win.blit(text.image, text.rect)
+                    dirty += [rect, text.rect]
+                    text.changed = False
 
-        # Create and draw number of players alive
-        text = self.font.render(f"Alive:{len(self.game.players)}", False, WHITE)
-        rect = text.get_rect(center=(self.master.SCREENRECT.width // 2, 370))
-        self.win.blit(text, rect)
+            self.buttons.draw(self.win)
+            dirty += [button.rect for button in self.buttons]
+            pygame.display.update(dirty)
 
-        self.buttons.draw(self.win)  # Draw buttons
+        self.text_rects = [text.rect for text in self.texts]
 
-        pygame.display.update()
+    # Redraws the whole window in the next frame
+    def invalidate(self):
+        self.full = True
 
     # Ends the training session
     def exit_training(self, function=None, *args):
@@ -434,6 +475,8 @@ class ManageAI(ScreenBase):
 
     # Method that creates buttons and divides them into pages if necessary
     def create_buttons(self):
+        from extended_population import get_instance_names
+
         names = get_instance_names()
         num_pages = math.ceil(len(names) / 5)
 
@@ -462,6 +505,8 @@ class ManageAI(ScreenBase):
 
     # Shows screen with Rename and Delete options
     def show_options(self, ai_name):
+        from extended_population import delete_instance, rename_instance
+
         # Create new button group
         self.temp_buttons = self.buttons
         self.buttons = ButtonGroup()
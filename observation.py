@@ -0,0 +1,86 @@
+from collections import deque
+
+import numpy as np
+
+from settings import *
+
+
+# Builds the neural network inputs of every plane at once each tick
+# The inputs of a plane are its y coordinate followed by the x and y distances to the nearest birds in front of it.
+# Birds are kept in a queue ordered by x, and since every plane shares the same x coordinate, the nearest birds only
+# need to be found once per tick. Their distances to every plane are then written into a preallocated array with one
+# vectorised operation per coordinate, however many birds are used as inputs
+class ObservationBuilder:
+    def __init__(self, plane_rect, num_planes, num_birds=NUM_BIRDS_INPUT):
+        self.plane_rect = plane_rect  # Rect of a plane. Only its x coordinates are used
+        self.num_birds = num_birds  # Number of birds included in the inputs
+        self.birds = deque()  # Birds in front of the planes, ordered by x coordinate
+
+        # Array that the inputs of each plane are written to, with one row per plane
+        self.observations = np.full((num_planes, num_birds * 2 + 1), 1000.0)
+
+    # Adds newly spawned bird
+    def add(self, bird):
+        if not self.birds or self.birds[-1].rect.x <= bird.rect.x:
+            self.birds.append(bird)
+        else:  # Birds move at the same speed so are spawned in order, but insert in order in case they aren't
+            num = next(num for num, other in enumerate(self.birds) if other.rect.x > bird.rect.x)
+            self.birds.insert(num, bird)
+
+    # Removes birds that have passed the planes
+    def remove_passed(self):
+        while self.birds and self.birds[0].rect.right < self.plane_rect.left:
+            self.birds.popleft()
+
+    # Returns list of the centres of the nearest birds in front of the planes, nearest first
+    def ahead(self):
+        return [self.birds[num].rect.center for num in range(min(self.num_birds, len(self.birds)))]
+
+    # Returns array of inputs for planes with the given centre y coordinates. Values are overwritten on the next call
+    def build(self, centery):
+        observations = self.observations[:len(centery)]
+        observations[:, 0] = centery
+
+        # Distances to the nearest birds, which are the same in x for every plane
+        ahead = self.ahead()
+        if ahead:
+            bird_x, bird_y = np.array(ahead, dtype=float).T
+            end = len(ahead) * 2 + 1
+            observations[:, 1:end:2] = bird_x - self.plane_rect.centerx
+            observations[:, 2:end:2] = bird_y - np.asarray(centery)[:, np.newaxis]
+            observations[:, end:] = 1000
+        else:
+            observations[:, 1:] = 1000
+
+        return observations
+
+
+# Returns array of inputs for the planes of several episodes, which are simulated together
+# 'counts' is the number of planes in each observer's episode, whose centre y coordinates are stored in that order in
+# 'centery'. The nearest birds are found once per episode, then the inputs of every plane are written with one
+# vectorised operation per coordinate, however many episodes there are. Gives the same inputs as each observer's build
+def build_episodes(observers, counts, centery):
+    num_birds = observers[0].num_birds
+
+    # Centres of the nearest birds in each episode. Episodes with fewer birds than inputs are padded, and their planes'
+    # inputs for the missing birds are set after
+    aheads = [observer.ahead() for observer in observers]
+    missing = []  # Slice of the planes of each episode with fewer birds than inputs, and its number of birds
+    if any(len(ahead) < num_birds for ahead in aheads):
+        start = 0
+        for ahead, count in zip(aheads, counts):
+            if len(ahead) < num_birds:
+                missing.append((start, start + count, len(ahead)))
+            start += count
+        aheads = [ahead + [(0, 0)] * (num_birds - len(ahead)) for ahead in aheads]
+    birds = np.repeat(np.array(aheads, dtype=float), counts, axis=0)  # Nearest birds of each plane's episode
+
+    centery = np.asarray(centery, dtype=float)  # Converted once, instead of in every subtraction
+    observations = np.empty((len(centery), num_birds * 2 + 1))
+    observations[:, 0] = centery
+    observations[:, 1::2] = birds[:, :, 0] - observers[0].plane_rect.centerx
+    observations[:, 2::2] = birds[:, :, 1] - centery[:, np.newaxis]
+    for start, end, num_ahead in missing:
+        observations[start:end, num_ahead * 2 + 1:] = 1000
+
+    return observations
@@ -0,0 +1,69 @@
+import multiprocessing
+import signal
+
+from settings import *
+from simulation import HeadlessMain, PopulationSim
+
+worker_config = None  # NEAT config used by worker processes
+
+
+# Evaluates genomes across a pool of worker processes
+# Genomes are split into small chunks which are each simulated in their own world, with the birds spawned from the
+# same seed for every chunk in a generation. Since planes don't affect the birds, each genome gets the same fitness as
+# it would in one shared world. Workers take one chunk at a time so a long episode doesn't hold up the others, and
+# genomes that did well in the previous generation are sent first, as they are likely to take the longest
+class ParallelEvaluator:
+    def __init__(self, num_workers=None, chunk_size=None):
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.chunk_size = chunk_size  # Number of genomes simulated together. Chosen automatically if None
+        self.pool = None
+
+    # Fitness function that evaluates genomes in the worker processes
+    def evaluate(self, genomes, config, seed=None):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.num_workers, init_worker, (config, PopulationSim.pixel_perfect,
+                                                                             PopulationSim.episodes,
+                                                                             PopulationSim.aggregate))
+
+        # Split genomes into chunks, with enough chunks for each worker to take several
+        chunk_size = self.chunk_size or max(1, len(genomes) // (self.num_workers * 4))
+
+        # Genomes carried over from the previous generation still have their fitness from it
+        order = sorted(range(len(genomes)), key=lambda num: -(genomes[num][1].fitness or 0))
+        tasks = []
+        for start in range(0, len(order), chunk_size):
+            chunk = order[start:start + chunk_size]
+            tasks.append((chunk, [genomes[num] for num in chunk], seed))
+
+        for genome_id, genome in genomes:
+            genome.fitness = 0
+
+        for chunk, fitnesses in self.pool.imap_unordered(evaluate_genomes, tasks):
+            for num, fitness in zip(chunk, fitnesses):
+                genomes[num][1].fitness = fitness
+
+    # Stops the worker processes
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+
+# Sets up a worker process
+def init_worker(config, pixel_perfect, episodes=TRAINING_EPISODES, aggregate=EPISODE_AGGREGATE):
+    global worker_config
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Interrupts are handled by the main process
+    worker_config = config
+    PopulationSim.master = HeadlessMain(WIDTH, HEIGHT)
+    PopulationSim.pixel_perfect = pixel_perfect
+    PopulationSim.episodes = episodes
+    PopulationSim.aggregate = aggregate
+
+
+# Simulates a chunk of genomes in a worker process and returns their fitness
+def evaluate_genomes(task):
+    chunk, genomes, seed = task
+    PopulationSim.from_ai(genomes, worker_config, seed)
+
+    return chunk, [genome.fitness for genome_id, genome in genomes]
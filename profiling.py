@@ -0,0 +1,111 @@
+import csv
+import json
+import os
+import time
+
+# Phases of a game loop tick, and of a training generation, in the order they happen
+TICK_PHASES = ["wait", "events", "update", "draw", "collision", "fitness"]
+GENERATION_PHASES = ["evaluate", "statistics", "reproduce", "speciate", "reporters", "checkpoint"]
+
+
+# Measures the time spent in each phase of a loop using the monotonic performance counter
+# 'begin' is called at the start of each iteration and 'mark' at the end of each phase, which adds the time since the
+# previous call to that phase. Times are summed until the timer is reset
+class PhaseTimer:
+    enabled = True
+
+    def __init__(self):
+        self.totals = {}  # Total seconds spent in each phase
+        self.count = 0  # Number of iterations completed
+        self.last = time.perf_counter()  # Time of the last call to 'begin' or 'mark'
+
+    # Starts timing an iteration
+    def begin(self):
+        self.last = time.perf_counter()
+
+    # Ends a phase, adding the time since the last phase ended to it
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0) + now - self.last
+        self.last = now
+
+    # Ends an iteration
+    def end(self):
+        self.count += 1
+
+    # Returns dictionary of the mean milliseconds spent in each phase per iteration
+    def means(self):
+        return {phase: total * 1000 / max(self.count, 1) for phase, total in self.totals.items()}
+
+    # Clears the times recorded
+    def reset(self):
+        self.totals = {}
+        self.count = 0
+
+
+# Timer that does nothing, used when timing is turned off so the game loop only pays for a few empty method calls
+class NullTimer:
+    enabled = False
+
+    def begin(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def end(self):
+        pass
+
+    def means(self):
+        return {}
+
+    def reset(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+# Times each training generation and the ticks of the games played in it, writing one row per generation to a log
+# The log is CSV, or JSON with one object per line if the path ends in .jsonl
+class GenerationProfiler:
+    def __init__(self, path=None):
+        self.path = path
+        self.generation = PhaseTimer()  # Times the phases of NEAT's generation loop
+        self.ticks = PhaseTimer()  # Times the phases of the game loop, for every tick in the generation
+        self.rows = []  # Row logged for each generation
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Start a new log file
+            with open(path, "w", newline="") as file:
+                if not path.endswith(".jsonl"):
+                    csv.writer(file).writerow(self.columns())
+
+    # Returns the columns of the log
+    @staticmethod
+    def columns():
+        return (["generation", "seconds", "ticks"] + [f"{phase}_s" for phase in GENERATION_PHASES] +
+                [f"tick_{phase}_s" for phase in TICK_PHASES])
+
+    # Logs the times of the generation that has just ended, then resets the timers for the next generation
+    def end_generation(self, generation):
+        values = [generation, round(sum(self.generation.totals.values()), 6), self.ticks.count]
+        values += [round(self.generation.totals.get(phase, 0), 6) for phase in GENERATION_PHASES]
+        values += [round(self.ticks.totals.get(phase, 0), 6) for phase in TICK_PHASES]
+        row = dict(zip(self.columns(), values))
+        self.rows.append(row)
+
+        if self.path:
+            with open(self.path, "a", newline="") as file:
+                if self.path.endswith(".jsonl"):
+                    file.write(json.dumps(row) + "\n")
+                else:
+                    csv.writer(file).writerow(values)
+
+        self.generation.reset()
+        self.ticks.reset()
+        return row
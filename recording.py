@@ -0,0 +1,193 @@
+import os
+import struct
+import zlib
+
+import numpy as np
+import pygame
+
+from sprites import *
+from world import World
+
+# Header of an episode file: magic string, version, seed (-1 if unseeded), number of planes, number of ticks,
+# number of birds spawned and bird velocity
+HEADER = struct.Struct("<4sBqIIIf")
+MAGIC = b"BSEP"
+VERSION = 1
+
+
+# Records an episode played by the AI so that it can be replayed without the neural networks
+# Stores the tick and height of every bird spawned, the direction each alive plane moved in every tick, and the tick
+# each plane died on. Planes are numbered in the order they were created, and alive planes are always kept in that order
+class EpisodeRecorder:
+    def __init__(self, num_planes, seed=None, bird_vel=-18):
+        self.num_planes = num_planes
+        self.seed = seed
+        self.bird_vel = bird_vel
+        self.spawns = []  # (tick, height) of each bird spawned
+        self.directions = []  # Arrays of the directions each alive plane moved in, for each tick
+        self.death_ticks = np.zeros(num_planes, dtype=np.uint32)  # Tick each plane died on, or 0 if it survived
+        self.alive = np.arange(num_planes)  # Numbers of the planes that are still alive
+
+    # Records a bird being spawned
+    def spawn(self, tick, height):
+        self.spawns.append((tick, height))
+
+    # Records the direction each alive plane moved in this tick
+    def actions(self, directions):
+        self.directions.append(np.asarray(directions, dtype=np.int8))
+
+    # Records alive planes dying, where dead is a boolean array with one value for each alive plane
+    def deaths(self, tick, dead):
+        dead = np.asarray(dead, dtype=bool)
+        self.death_ticks[self.alive[dead]] = tick
+        self.alive = self.alive[~dead]
+
+    # Saves the episode to a compact binary file
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        spawns = np.array(self.spawns, dtype=np.uint32).reshape(-1, 2)
+        directions = np.concatenate(self.directions) if self.directions else np.zeros(0, dtype=np.int8)
+
+        # Directions of -1, 0 and 1 are stored as 2, 0 and 1, with four directions packed into each byte
+        codes = np.zeros(-(-len(directions) // 4) * 4, dtype=np.uint8)
+        codes[:len(directions)] = directions % 3
+        codes = codes.reshape(-1, 4)
+        packed = codes[:, 0] | (codes[:, 1] << 2) | (codes[:, 2] << 4) | (codes[:, 3] << 6)
+
+        body = b"".join((spawns[:, 0].astype("<u4").tobytes(), spawns[:, 1].astype("<u2").tobytes(),
+                         self.death_ticks.astype("<u4").tobytes(), np.uint32(len(directions)).tobytes(),
+                         packed.astype(np.uint8).tobytes()))
+        seed = -1 if self.seed is None else self.seed
+        header = HEADER.pack(MAGIC, VERSION, seed, self.num_planes, len(self.directions), len(spawns), self.bird_vel)
+
+        with open(path, "wb") as file:
+            file.write(header + zlib.compress(body, 9))
+
+
+# Removes all but the 'keep' latest recordings in a folder whose names start with the given prefix
+# Recordings are named after the time they were saved, so they are sorted by name
+def remove_old_recordings(directory, prefix, keep):
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.startswith(prefix) and name.endswith(".episode"))
+    except FileNotFoundError:
+        return
+
+    for name in names[:-keep] if keep else names:
+        try:
+            os.remove(f"{directory}/{name}")
+        except FileNotFoundError:
+            pass
+
+
+# Replays an episode file, re-simulating the birds and planes from the recorded spawns and directions
+# Can be stepped through headlessly, or drawn to a window at any of the speeds in SPEED_STAGES
+class EpisodeReplay:
+    def __init__(self, master, path):
+        self.master = master
+        self.tickcount = 0
+        self.score = 0
+
+        with open(path, "rb") as file:
+            data = file.read()
+
+        magic, version, seed, self.num_planes, self.num_ticks, num_spawns, self.bird_vel = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} episode file")
+        self.seed = None if seed == -1 else seed
+
+        # Unpack body
+        body = zlib.decompress(data[HEADER.size:])
+        offset = 0
+        spawn_ticks = np.frombuffer(body, "<u4", num_spawns, offset)
+        offset += spawn_ticks.nbytes
+        spawn_heights = np.frombuffer(body, "<u2", num_spawns, offset)
+        offset += spawn_heights.nbytes
+        self.death_ticks = np.frombuffer(body, "<u4", self.num_planes, offset)
+        offset += self.death_ticks.nbytes
+        num_directions = int(np.frombuffer(body, "<u4", 1, offset)[0])
+        offset += 4
+
+        packed = np.frombuffer(body, np.uint8, -1, offset)
+        codes = np.stack([(packed >> shift) & 3 for shift in (0, 2, 4, 6)], axis=1).ravel()[:num_directions]
+        self.directions = np.where(codes == 2, -1, codes.astype(np.int8))
+        self.next_direction = 0  # Index of the first direction of the next tick
+
+        self.spawns = dict(zip(spawn_ticks.tolist(), spawn_heights.tolist()))
+
+        # Set up birds and planes as they were at the start of the episode
+        self.world = World(master.SCREENRECT)
+        self.world.bird_vel = self.bird_vel
+        self.all = self.world.all
+        self.birds = self.world.birds
+        self.background = Background(self.world)
+
+        self.plane_image = Assets.image("images/plane.png")
+        self.plane_rect = self.plane_image.get_rect(center=master.SCREENRECT.center)
+        self.max_top = master.SCREENRECT.height - self.plane_rect.height  # Lowest position a plane can move to
+        self.alive = np.arange(self.num_planes)  # Numbers of the planes that are still alive
+        self.top = np.full(self.num_planes, self.plane_rect.top)  # y coordinate of the top of each alive plane
+
+    # Advances the replay by one tick. Returns False once the episode has ended
+    def step(self):
+        if self.tickcount >= self.num_ticks:
+            return False
+
+        self.tickcount += 1
+
+        # Remove birds that have left the screen and spawn new birds
+        self.world.remove_offscreen()
+        if self.tickcount in self.spawns:
+            Bird(self.world, self.spawns[self.tickcount])
+
+        self.all.update()
+
+        # Move planes in the recorded directions
+        end = self.next_direction + len(self.alive)
+        direction = self.directions[self.next_direction:end]
+        self.next_direction = end
+        self.top = np.clip(self.top + direction * Player.SPEED, 0, self.max_top)
+
+        # Remove planes that died this tick
+        alive = self.death_ticks[self.alive] != self.tickcount
+        self.alive = self.alive[alive]
+        self.top = self.top[alive]
+
+        if self.tickcount % (FPS // 20) == 0:
+            self.score += 1
+
+        return True
+
+    # Replays the whole episode without drawing it
+    def run_headless(self):
+        while self.step():
+            pass
+
+    # Replays the episode in a window. Speed can be changed with the left and right arrow keys, and Esc exits
+    def run(self, stage=0):
+        window = self.master.screen
+        font = Assets.font(30)
+
+        running = True
+        while running and self.step():
+            self.master.clock.tick(FPS * SPEED_STAGES[stage])
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    running = False
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_RIGHT:
+                        stage = (stage + 1) % len(SPEED_STAGES)
+                    if event.key == pygame.K_LEFT:
+                        stage = (stage - 1) % len(SPEED_STAGES)
+
+            # Draw sprites, planes and text
+            self.all.draw(window)
+            window.blits([(self.plane_image, (self.plane_rect.x, top)) for top in self.top.tolist()])
+            for num, text in enumerate((f"Score: {self.score}", f"Alive: {len(self.alive)}",
+                                        f"{SPEED_STAGES[stage]}x")):
+                window.blit(font.render(text, False, WHITE), (5, 5 + num * 35))
+
+            pygame.display.update()
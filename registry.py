@@ -0,0 +1,143 @@
+import contextlib
+import csv
+import os
+import pickle
+import re
+import sqlite3
+import time
+from collections import namedtuple
+
+from settings import *
+
+# Saved details of an AI instance: its name, path of its latest checkpoint, generation and best fitness of that
+# checkpoint (None if unknown), and the time it was last trained (None if unknown)
+Instance = namedtuple("Instance", ["name", "path", "generation", "best_fitness", "last_trained"])
+
+
+# Index of the saved AI instances, stored in an SQLite database
+# Instances are looked up by their lowercase name, which is the table's primary key, so finding, renaming or deleting an
+# instance doesn't read the whole index, and each change is made in a single transaction that other processes can't
+# see half of. Instances are listed in the order they were added. The first time the database is created, the
+# instances in the old CSV index are imported into it
+class InstanceRegistry:
+    def __init__(self, path=REGISTRY_FILE, csv_path=CSV_INDEX_FILE):
+        self.path = path
+        self.csv_path = csv_path  # Old index imported when the database is created
+        self.created = False  # Whether the database has been created or opened
+
+    # Returns list of instance names, in the order they were added
+    def names(self):
+        with self.transaction() as db:
+            return [name for name, in db.execute("SELECT name FROM instances ORDER BY rowid")]
+
+    # Returns the saved details of the instance with the given name, ignoring case, or None if it doesn't exist
+    def get(self, name):
+        with self.transaction() as db:
+            row = db.execute("SELECT name, path, generation, best_fitness, last_trained FROM instances WHERE key = ?",
+                             (name.lower(), )).fetchone()
+
+        return Instance(*row) if row else None
+
+    # Links an instance to the checkpoint at the given path, adding the instance if it doesn't exist
+    def set_checkpoint(self, name, path, generation=None, best_fitness=None):
+        with self.transaction() as db:
+            db.execute("INSERT INTO instances (key, name, path, generation, best_fitness, last_trained) "
+                       "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET name = excluded.name, "
+                       "path = excluded.path, generation = excluded.generation, best_fitness = excluded.best_fitness, "
+                       "last_trained = excluded.last_trained",
+                       (name.lower(), name, path, generation, best_fitness, time.time()))
+
+    # Removes the instance with the given name. Returns whether it existed
+    def delete(self, name):
+        with self.transaction() as db:
+            return db.execute("DELETE FROM instances WHERE key = ?", (name.lower(), )).rowcount > 0
+
+    # Renames an instance, changing the start of its checkpoint path from the old folder to the new one
+    # 'move' is called inside the transaction to move the instance's save data, so the index isn't changed if it fails
+    # Returns False if the instance doesn't exist
+    def rename(self, name, new_name, old_folder, new_folder, move=None):
+        with self.transaction() as db:
+            row = db.execute("SELECT path FROM instances WHERE key = ?", (name.lower(), )).fetchone()
+            if row is None:
+                return False
+
+            path = row[0]
+            if path and path.startswith(old_folder):
+                path = new_folder + path[len(old_folder):]
+            db.execute("UPDATE instances SET key = ?, name = ?, path = ? WHERE key = ?",
+                       (new_name.lower(), new_name, path, name.lower()))
+
+            if move is not None:
+                move()
+
+        return True
+
+    # Context manager that opens the database and runs the statements inside it in one transaction, which is committed
+    # if they succeed and rolled back if an exception is raised. Creates the database if it doesn't exist
+    # A connection is opened for each transaction, so the registry can be used by the checkpointing thread
+    @contextlib.contextmanager
+    def transaction(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if not self.created:
+                    self.create(db)
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    # Creates the instances table if it doesn't exist, importing the instances in the old CSV index into it
+    def create(self, db):
+        exists = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'instances'").fetchone()
+        if not exists:
+            db.execute("CREATE TABLE instances (key TEXT PRIMARY KEY, name TEXT NOT NULL, path TEXT, "
+                       "generation INTEGER, best_fitness REAL, last_trained REAL)")
+
+            try:
+                with open(self.csv_path, newline="") as file:
+                    rows = [row for row in csv.reader(file) if row and row[0]]  # Skip blank rows
+            except FileNotFoundError:
+                rows = []
+
+            for row in rows:
+                db.execute("INSERT OR IGNORE INTO instances (key, name, path, generation, best_fitness, last_trained) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", (row[0].lower(), row[0], *imported_details(row)))
+
+        self.created = True
+
+
+# Returns the checkpoint path, generation, best fitness and last trained time of an instance in the old CSV index
+# The generation is read from the checkpoint's name, the best fitness from the instance's best genome, and the last
+# trained time is when the checkpoint was written. Details that can't be found are None
+def imported_details(row):
+    path = row[1] if len(row) > 1 else None
+    if not path:
+        return path, None, None, None
+
+    match = re.search(r"gen-(\d+)$", path)
+    generation = int(match.group(1)) if match else None
+
+    try:
+        with open(os.path.join(os.path.dirname(path), "best.pickle"), "rb") as file:
+            best_fitness = pickle.load(file).fitness
+    except Exception:  # Missing or unreadable
+        best_fitness = None
+
+    try:
+        last_trained = os.path.getmtime(path)
+    except OSError:
+        last_trained = None
+
+    return path, generation, best_fitness, last_trained
+
+
+REGISTRY = InstanceRegistry()
@@ -0,0 +1,109 @@
+import pygame
+
+from assets import *
+
+
+# Draws the game by only repainting and updating the parts of the window that change each frame
+# The background is a plain sky with clouds scrolling across it, so scrolling only changes the pixels around the
+# clouds. Each frame, the areas the clouds moved through, the areas sprites were drawn to in the last frame and the
+# areas of text that has changed are repainted from the opaque background surface. Sprites are then drawn, followed by
+# any text that has changed or was painted over, and only the repainted and drawn rects are passed to display.update.
+# The whole window is redrawn after 'invalidate' is called, such as when another screen has been drawn over the game
+class DirtyRenderer:
+    def __init__(self, window, background):
+        self.window = window
+        self.background = background  # Background sprite, whose image is the double-width scrolling background
+        self.regions = Assets.background_regions()  # Rects of the clouds in the background image
+        self.width = self.background.rect.width // 2  # Width of one copy of the background image
+        self.last_x = self.background.rect.x  # Position of the background in the last frame
+        self.drawn = []  # Rects sprites were drawn to in the last frame
+        self.texts = {}  # Rect each HudText was drawn to in the last frame
+        self.full = True  # Whether the whole window is redrawn in the next frame
+
+    # Redraws the whole window in the next frame
+    def invalidate(self):
+        self.full = True
+
+    # Draws every sprite in the group except the background, then draws the given HudTexts on top, and updates the
+    # parts of the display that have changed
+    def draw(self, group, texts=()):
+        background = self.background
+        window = self.window
+
+        # Repaint the background where it has changed or been drawn over
+        if self.full:
+            window.blit(background.image, background.rect)
+            dirty = [window.get_rect()]
+        else:
+            erased = [rect for text, rect in self.texts.items() if text.changed or text not in texts]
+            dirty = merge(self.drawn + self.scrolled() + erased)
+            area = (-background.rect.x, -background.rect.y)
+            window.blits([(background.image, rect, rect.move(area)) for rect in dirty], False)
+
+        self.last_x = background.rect.x
+
+        # Sprites drawn with the same image in the same place are only drawn once, in the place of the last of them.
+        # Since every pixel of the images is either fully opaque or fully transparent, this looks the same as drawing
+        # all of them, and saves drawing the many planes that overlap exactly when training
+        sprites = {}
+        for sprite in group:
+            if sprite is not background:
+                key = (sprite.image, sprite.rect.x, sprite.rect.y)
+                sprites.pop(key, None)
+                sprites[key] = sprite.rect
+
+        self.drawn = window.blits([(image, rect) for (image, x, y), rect in sprites.items()])
+
+        # Draw text that has changed, or that the background or sprites were drawn over. Text that hasn't changed is
+        # left as it is, since its pixels are also either fully opaque or fully transparent
+        drawn = merge(self.drawn)
+        redrawn = []
+        for text in texts:
+            if self.full or text.changed or text.rect.collidelist(dirty) != -1 or text.rect.collidelist(drawn) != -1:
+                redrawn.append(window.blit(text.image, text.rect))
+                text.changed = False
+
+        self.texts = {text: text.rect for text in texts}
+
+        if self.full:
+            pygame.display.update()
+            self.full = False
+        else:
+            pygame.display.update(dirty + drawn + redrawn)
+
+    # Returns list of rects covering the clouds at their last and current positions
+    # Frames can be skipped when training, so the background may have moved any distance, or wrapped around, since then
+    def scrolled(self):
+        x = self.background.rect.x
+        if x == self.last_x:
+            return []
+
+        screen = self.window.get_rect()
+        rects = []
+        for region in self.regions:
+            for copy in (0, self.width):  # The background image is drawn twice, side by side
+                old = region.move(self.last_x + copy, 0).clip(screen)
+                new = region.move(x + copy, 0).clip(screen)
+                if old.colliderect(new):
+                    rects.append(old.union(new))
+                else:
+                    rects += [rect for rect in (old, new) if rect]
+
+        return rects
+
+
+# Returns list of rects covering the given rects, where overlapping rects are joined if that doesn't cover more area
+# Planes are all drawn in one column, so their overlapping rects are joined into a few strips
+def merge(rects):
+    merged = []
+    for rect in sorted(rects, key=lambda rect: (rect.x, rect.y)):
+        if merged:
+            last = merged[-1]
+            union = last.union(rect)
+            if last.colliderect(rect) and union.w * union.h <= last.w * last.h + rect.w * rect.h:
+                merged[-1] = union
+                continue
+
+        merged.append(rect)
+
+    return merged
@@ -5,19 +5,70 @@ HEIGHT = 650
 # Window title and FPS
 TITLE = "Birdstrike"
 FPS = 60
+RENDER_FPS = 60  # Max frames drawn per second when training, however many ticks are run
+MENU_WAIT_TIMEOUT = 250  # Max milliseconds menus sleep waiting for input before checking the buttons again
+
+# Bird and background velocities when the game starts
+INITIAL_BIRD_VEL = -10
+BACKGROUND_VEL = -5
 
 # Bird spawn settings
 INITIAL_BIRD_PROBABILITY = 0.5  # Average chance of bird spawning each second
 INITIAL_SPAWNRATE = 6  # Max number of birds that can spawn each second (If greater than FPS, will be set to FPS)
 INITIAL_MAXTIME = 3  # Maximum time in seconds that can pass without a bird spawning
 
+# Bird velocity, spawnrate and maxtime used when the AI plays
+AI_DIFFICULTY = (-18, 2, 0.5)
+
 # Config file location
 CONFIG_FILE = "config-feedforward.txt"
 
+# Font used for all text
+FONT_FILE = "game-font.ttf"
+
+# Optional file holding the decoded images, built with 'python -m birdstrike bundle', which is faster to load than the
+# PNGs in images/. None turns it off
+ASSET_BUNDLE = "assets.bundle"
+
+# Database listing the saved AI instances, and the CSV index it replaces, which is imported when the database is created
+REGISTRY_FILE = "ai-instances/registry.db"
+CSV_INDEX_FILE = "ai-instances/index.csv"
+
+# Checkpoints of the population are saved every CHECKPOINT_GENERATIONS generations or CHECKPOINT_MINUTES minutes while
+# training. The CHECKPOINT_KEEP most recent are kept, along with those of every CHECKPOINT_KEEP_EVERY generations
+CHECKPOINT_GENERATIONS = 10
+CHECKPOINT_MINUTES = 5
+CHECKPOINT_KEEP = 3
+CHECKPOINT_KEEP_EVERY = 100
+CHECKPOINT_FORMAT = "neat"  # "neat" for NEAT's gzipped pickles, or "compact" for compact checkpoints that load lazily
+
+# When training with islands, each island sends copies of its ISLAND_MIGRANTS best genomes to the next island every
+# ISLAND_MIGRATION_INTERVAL generations
+ISLAND_MIGRATION_INTERVAL = 10
+ISLAND_MIGRANTS = 2
+
+# Folder that recordings of episodes played by the AI are saved to
+RECORDINGS_DIR = "recordings"
+TEST_RECORDINGS_KEEP = 20  # Number of the latest recordings of tests from the menu kept for each instance. 0 turns off
+
+# Folder that logs of the time spent in each phase of training are saved to
+PROFILES_DIR = "profiles"
+
 # AI Settings
 NUM_BIRDS_INPUT = 2
 NUM_INPUTS = NUM_BIRDS_INPUT * 2 + 1
 SPEED_STAGES = [1, 2, 3, 5, 10]
+BATCH_MIN_GENOMES = 8  # Populations smaller than this use compiled networks instead of one batch network
+COMPILE_CACHE_SIZE = 1000  # Max number of compiled networks kept for reuse in later generations
+FITNESS_CACHE_SIZE = 10000  # Max number of genome fitnesses kept for reuse when episodes have the same seed
+PIXEL_PERFECT_TRAINING = False  # Whether training uses pixel perfect collision, like testing does, or rect collision
+TRAINING_EPISODES = 1  # Number of episodes each genome plays when training with the vectorised engine
+EPISODE_AGGREGATE = "mean"  # How a genome's fitness in each episode is combined into its fitness: "mean" or "min"
+PROFILE_TRAINING = False  # Whether training from the menu logs the time spent in each phase of each generation
+
+# Whether the game only redraws the parts of the window that change each frame, instead of the whole window
+DIRTY_RENDERING = True
+HUD_CACHE_SIZE = 500  # Max number of rendered text surfaces kept for reuse
 
 # Colour constants
 BLACK = (0, 0, 0)
@@ -0,0 +1,219 @@
+import numpy as np
+import pygame
+from pygame import Rect
+
+from batch_network import BatchNetwork
+from collision import PackedMasks
+from compiled_network import CompiledNetwork
+from observation import ObservationBuilder, build_episodes
+from profiling import NULL_TIMER
+from recording import EpisodeRecorder
+from sprites import *
+from world import World
+
+
+# Stand-in for the Main window class, used when the game is run without a display
+class HeadlessMain:
+    def __init__(self, width, height):
+        self.screen = None
+        self.clock = None
+        self.SCREENRECT = Rect(0, 0, width, height)  # Create Rect object for screen
+
+
+# Functions that combine each genome's fitness in every episode it played into its fitness
+AGGREGATES = {"mean": np.mean, "min": np.min}
+
+
+# Game engine used for training that simulates the whole population at once
+# The state of every plane is stored in NumPy arrays and updated with whole-array operations each tick, following the
+# same rules as Game does for its Player sprites. Planes that die are compacted out of the arrays.
+# Birds are spawned using a random number generator seeded with 'seed', so episodes with the same seed are identical.
+# Each genome can play several episodes, which are simulated together in lock-step: every episode has its own world,
+# and each genome has a plane in every world. Every episode is stepped in each tick, and the networks of the planes in
+# all of them are activated together, so the per tick overhead is shared between episodes
+class PopulationSim:
+    master = None
+    pixel_perfect = PIXEL_PERFECT_TRAINING  # Whether pixel perfect collision is used instead of rect collision
+    episodes = TRAINING_EPISODES  # Number of episodes each genome plays
+    aggregate = EPISODE_AGGREGATE  # Name of the function in AGGREGATES that combines the fitness of each episode
+    timer = NULL_TIMER  # Times each phase of the game loop
+
+    def __init__(self, master, genomes, config, seed=None, record=False):
+        if record and self.episodes > 1:
+            raise ValueError("Only simulations of one episode can be recorded")
+
+        # Initialise default attributes
+        self.master = master
+        self.tickcount = 0
+        self.score = 0
+        self.running = True
+
+        # Create the world birds are spawned in for each episode, with the difficulty used for training. Planes aren't
+        # sprites, so the worlds only hold birds
+        self.worlds = [World(master.SCREENRECT, AI_DIFFICULTY, seed) for seed in episode_seeds(seed, self.episodes)]
+
+        # Rect of a plane in its starting position. All planes share its x coordinate and size
+        self.plane_rect = Assets.image("images/plane.png").get_rect(center=master.SCREENRECT.center)
+        self.plane_mask = Assets.mask("images/plane.png")
+        self.max_top = master.SCREENRECT.height - self.plane_rect.height  # Lowest position a plane can move to
+
+        # Link each plane with its genome and network
+        # Large populations are activated together by a batch network, small ones by each genome's compiled network
+        self.genomes = [genome for genome_id, genome in genomes]
+        if len(self.genomes) >= BATCH_MIN_GENOMES:
+            self.network = BatchNetwork(self.genomes, config)
+            self.networks = None
+        else:
+            self.network = None
+            self.networks = [CompiledNetwork.create(genome, config) for genome in self.genomes]
+
+        # Arrays storing the state of the planes that are still alive. Plane p plays episode p // len(genomes) and is
+        # controlled by genome p % len(genomes), so planes are ordered by episode
+        num_planes = len(self.genomes) * self.episodes
+        self.index = np.arange(num_planes)  # Index of each alive plane
+        self.rows = self.index % max(len(self.genomes), 1)  # Index of each alive plane's genome
+        self.top = np.full(num_planes, self.plane_rect.top)  # y coordinate of the top of each alive plane
+        self.lastmoved = np.zeros(num_planes, dtype=int)  # Ticks since each alive plane last moved
+        self.ends = np.cumsum([len(self.genomes)] * self.episodes)  # End of each episode's planes in the alive arrays
+
+        # Array storing the fitness of every plane, including those that have died
+        self.fitness = np.zeros(num_planes)
+
+        # Track the birds in front of the planes in each episode
+        self.observers = [ObservationBuilder(self.plane_rect, len(self.genomes)) for world in self.worlds]
+        self.live = self.live_episodes()  # Episodes that still have planes alive
+        # Records the episode
+        self.recorder = EpisodeRecorder(num_planes, seed, self.worlds[0].bird_vel) if record else None
+
+    # Main game loop
+    def run(self):
+        try:
+            timer = self.timer
+            while self.running:
+                timer.begin()
+                self.tickcount += 1
+                self.events()
+                timer.mark("events")
+
+                # End game when there are no planes left
+                if len(self.index) == 0:
+                    break
+
+                self.update()
+                timer.mark("update")
+                self.collide()
+                timer.mark("collision")
+
+                # Increase score
+                if self.tickcount % (FPS // 20) == 0:
+                    self.score += 1
+
+                # Increase fitness, removing fitness from planes near the top or bottom of the screen
+                centery = self.top + self.plane_rect.height // 2
+                in_middle = (HEIGHT // 10 <= centery) & (centery <= (9 * HEIGHT) // 10)
+                self.fitness[self.index] += 0.1 + (-1.1 * ~in_middle)
+                timer.mark("fitness")
+                timer.end()
+        finally:
+            # Copy fitness values to the genomes, even if training was interrupted
+            fitness = AGGREGATES[self.aggregate](self.fitness.reshape(self.episodes, len(self.genomes)), axis=0)
+            for genome, genome_fitness in zip(self.genomes, fitness):
+                genome.fitness = float(genome_fitness)
+
+    # Returns list of (world, observer, start, end) tuples for each episode that still has planes alive, where start and
+    # end are the slice of the alive arrays holding its planes
+    def live_episodes(self):
+        starts = np.concatenate(([0], self.ends[:-1]))
+        return [(world, observer, start, end)
+                for world, observer, start, end in zip(self.worlds, self.observers, starts.tolist(), self.ends.tolist())
+                if start < end]
+
+    # Removes birds that have left the screen or passed the planes and spawns new birds
+    # Episodes whose planes have all died are no longer simulated
+    def events(self):
+        for world, observer, start, end in self.live:
+            world.remove_offscreen()
+            observer.remove_passed()
+
+            bird = world.spawn(self.tickcount)
+            if bird:
+                observer.add(bird)
+                if self.recorder is not None:
+                    self.recorder.spawn(self.tickcount, bird.rect.centery)
+
+    # Moves birds, then moves planes up or down depending on their neural network outputs
+    def update(self):
+        for world, observer, start, end in self.live:
+            world.birds.update()
+
+        outputs = self.activate(self.get_inputs())
+        max_output = outputs.max(axis=1)
+        direction = np.where(max_output >= 0.25, 2 * outputs.argmax(axis=1) - 1, 0)
+
+        self.top = np.clip(self.top + direction * Player.SPEED, 0, self.max_top)  # Keeps planes within screen
+        if self.recorder is not None:
+            self.recorder.actions(direction)
+
+        # Count how long each plane has stayed still, and remove fitness if planes stay still for too long
+        still = (direction == 0) | (self.top == 0) | (self.top == self.max_top)
+        self.lastmoved = np.where(still, self.lastmoved + 1, 0)
+        self.fitness[self.index[self.lastmoved >= 2 * FPS]] -= 1
+
+    # Returns array containing the neural network inputs of every alive plane
+    def get_inputs(self):
+        centery = self.top + self.plane_rect.height // 2
+        if self.episodes == 1:
+            return self.observers[0].build(centery)
+
+        return build_episodes([observer for world, observer, start, end in self.live],
+                              [end - start for world, observer, start, end in self.live], centery)
+
+    # Returns array containing the outputs of every alive plane's neural network
+    def activate(self, inputs):
+        if self.networks is None:
+            return self.network.activate(inputs, self.rows)
+
+        return np.array([self.networks[i].activate(row) for i, row in zip(self.rows, inputs.tolist())])
+
+    # Kills planes that collide with a bird in their episode
+    def collide(self):
+        hit = np.zeros(len(self.index), dtype=bool)
+        for world, observer, start, end in self.live:
+            top = self.top[start:end]
+            for bird in world.birds:
+                if bird.rect.left < self.plane_rect.right and bird.rect.right > self.plane_rect.left:
+                    if self.pixel_perfect:
+                        hit[start:end] |= PackedMasks.overlaps(self.plane_mask, bird.mask,
+                                                               bird.rect.left - self.plane_rect.left,
+                                                               bird.rect.top - top)
+                    else:
+                        hit[start:end] |= (top < bird.rect.bottom) & (top + self.plane_rect.height > bird.rect.top)
+
+        if hit.any():
+            if self.recorder is not None:
+                self.recorder.deaths(self.tickcount, hit)
+
+            alive = ~hit
+            self.index = self.index[alive]
+            self.rows = self.rows[alive]
+            self.top = self.top[alive]
+            self.lastmoved = self.lastmoved[alive]
+            self.ends = np.cumsum(np.bincount(self.index // len(self.genomes), minlength=self.episodes))
+            self.live = self.live_episodes()
+
+    # Creates simulation for training the AI and runs it
+    @classmethod
+    def from_ai(cls, genomes, config, seed=None, record=False):
+        sim = cls(cls.master, genomes, config, seed, record)
+        sim.run()
+        return sim
+
+
+# Returns list of the seeds birds are spawned from in each of 'episodes' episodes
+# The first episode uses the given seed, so simulating one episode is the same as before episodes were added, and the
+# others use seeds derived from it, so every genome in a generation meets the same birds in each episode
+def episode_seeds(seed, episodes):
+    if seed is None:
+        return [None] * episodes
+
+    return [seed] + [f"{seed}-{num}" for num in range(1, episodes)]
@@ -0,0 +1,66 @@
+import random
+
+import pygame
+
+from sprites import *
+
+
+# State of one game world: the difficulty, the bird spawn timer, the sprite groups and the random number generator
+# used to spawn birds. Sprites belong to a world and read the difficulty from it, so several worlds can be simulated in
+# one process, one after another or in separate threads, without affecting each other. Images and masks are loaded
+# once by Assets and shared by every world
+class World:
+    def __init__(self, screen_rect, difficulty=None, seed=None):
+        self.screen_rect = screen_rect
+        self.rng = random.Random(seed)  # Random number generator used to spawn birds
+
+        # Difficulty, which is increased over time when the user plays
+        self.bird_vel = INITIAL_BIRD_VEL
+        self.spawnrate = INITIAL_SPAWNRATE  # Max number of birds that can spawn each second
+        self.maxtime = INITIAL_MAXTIME  # Maximum time in seconds that can pass without a bird spawning
+        self.probability = INITIAL_BIRD_PROBABILITY  # Average chance of a bird spawning each second
+        self.background_vel = BACKGROUND_VEL
+        if difficulty is not None:
+            self.bird_vel, self.spawnrate, self.maxtime = difficulty
+
+        self.lastspawn = 0  # Keeps track of how long has passed since last bird was spawned
+
+        # Sprite groups. Every sprite is added to 'all', and birds and players to their own groups
+        self.all = pygame.sprite.Group()
+        self.birds = pygame.sprite.Group()
+        self.players = pygame.sprite.Group()
+
+    # Removes the oldest bird once it has left the screen
+    def remove_offscreen(self):
+        birds = self.birds.sprites()
+        if birds and birds[0].rect.right < 0:
+            birds[0].kill()
+
+    # Calls random spawn method 'spawnrate' times per second. Returns the bird spawned, or None
+    def spawn(self, tickcount):
+        self.lastspawn += 1
+        self.spawnrate = min(self.spawnrate, FPS)  # Birds can spawn at most once per tick
+        if tickcount % (FPS // self.spawnrate) == 0:
+            return self.random_spawn()
+
+        return None
+
+    # Random chance of spawning bird at random height. Returns the bird, or None if one wasn't spawned
+    def random_spawn(self):
+        if (self.rng.random() <= (self.probability / self.spawnrate)) or (self.lastspawn >= self.maxtime * FPS):
+            self.lastspawn = 0
+            height = self.rng.randint(40, HEIGHT - 40)
+            return Bird(self, height)
+
+        return None
+
+    # Make game get progressively harder
+    def increase_difficulty(self):
+        self.bird_vel -= (0.3 / FPS)
+        self.background_vel -= (0.2 / FPS)
+
+        if self.spawnrate < FPS:  # Stop increasing spawnrate when it reaches FPS
+            self.spawnrate += (1 / FPS)
+
+        if self.maxtime > 0.25:  # Stop increasing maxtime when it reaches 0.25
+            self.maxtime -= (0.07 / FPS)